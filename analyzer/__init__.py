@@ -1,4 +1,4 @@
 """Analytics module."""
-from .calculator import Calculator
+from .calculator import Calculator, get_calculator
 
-__all__ = ['Calculator']
\ No newline at end of file
+__all__ = ['Calculator', 'get_calculator']
\ No newline at end of file
@@ -1,5 +1,168 @@
 """Financial metrics calculator."""
-from models.product import Product, ProductMetrics
+from collections.abc import Sequence
+from functools import lru_cache
+from itertools import islice
+from operator import attrgetter
+from typing import Any, Dict, Iterable
+
+import numpy as np
+
+from models.product import Product, ProductBatch, ProductFrame, ProductMetrics
+
+try:
+    from numba import njit, prange
+except ImportError:  # numba опционален: без него считаем на чистом NumPy
+    njit = None
+
+# Формулы над скалярными числами: не зависят от Product и вызываются без диспетчеризации через класс
+
+def calc_cogs(sales: float, returns: float, self_purchase_count: float, giveaway_count: float,
+              cost_per_unit: float, giveaway_cost: float) -> float:
+    """COGS = (Продажи - Возвраты - Самовыкупы - Раздачи) × Себестоимость/ед + Себестоимость раздач."""
+    return (sales - returns - self_purchase_count - giveaway_count) * cost_per_unit + giveaway_cost
+
+def calc_gross_profit(revenue: float, cogs: float) -> float:
+    """Валовая прибыль = Выручка после СПП - COGS."""
+    return revenue - cogs
+
+def calc_total_expenses(logistics_cost: float, storage_cost: float, penalty_cost: float,
+                        acceptance_cost: float, commission_with_spp: float, drr_cost: float,
+                        marketing_cost: float, surcharges: float) -> float:
+    """Расходы = Логистика + Хранение + Штрафы + Приёмка + Комиссия + ДРР + Маркетинг - Доплаты."""
+    return (
+        logistics_cost
+        + storage_cost
+        + penalty_cost
+        + acceptance_cost
+        + commission_with_spp
+        + drr_cost
+        + marketing_cost
+        - surcharges  # Доплаты вычитаются
+    )
+
+def calc_net_profit(gross_profit: float, total_expenses: float) -> float:
+    """Чистая прибыль = Валовая прибыль - Все расходы."""
+    return gross_profit - total_expenses
+
+def calc_profit_margin(gross_profit: float, revenue: float) -> float:
+    """Маржа (%) = (Валовая прибыль / Выручка) × 100."""
+    if revenue == 0:
+        return 0.0
+    return (gross_profit / revenue) * 100
+
+def calc_roi(net_profit: float, cogs: float) -> float:
+    """ROI (%) = (Чистая прибыль / COGS) × 100."""
+    if cogs == 0:
+        return 0.0
+    return (net_profit / cogs) * 100
+
+def calc_avg_check(revenue: float, sales: float) -> float:
+    """Средний чек = Выручка / Продажи."""
+    if sales == 0:
+        return 0.0
+    return revenue / sales
+
+# Поля товара, раскладываемые в массивы для пакетного расчёта
+_BATCH_COLUMNS = {
+    'sales': attrgetter('sales'),
+    'returns': attrgetter('returns'),
+    'self_purchase_count': attrgetter('manual_data.self_purchase_count'),
+    'giveaway_count': attrgetter('manual_data.giveaway_count'),
+    'cost_per_unit': attrgetter('manual_data.cost_per_unit'),
+    'giveaway_cost': attrgetter('manual_data.giveaway_cost'),
+    'sales_amount_after_spp': attrgetter('sales_amount_after_spp'),
+    'logistics_cost': attrgetter('logistics_cost'),
+    'storage_cost': attrgetter('storage_cost'),
+    'penalty_cost': attrgetter('penalty_cost'),
+    'acceptance_cost': attrgetter('acceptance_cost'),
+    'commission_with_spp': attrgetter('commission_with_spp'),
+    'drr_cost': attrgetter('drr_cost'),
+    'marketing_cost': attrgetter('manual_data.marketing_cost'),
+    'surcharges': attrgetter('surcharges'),
+}
+
+def _safe_ratio(numerator: np.ndarray, denominator: np.ndarray) -> np.ndarray:
+    """Поэлементное деление, 0.0 там, где знаменатель равен нулю."""
+    return np.divide(numerator, denominator, out=np.zeros_like(numerator), where=denominator != 0)
+
+def _compute_metrics_numpy(cols: Dict[str, np.ndarray]) -> Dict[str, np.ndarray]:
+    """Рассчитать все метрики над массивами полей (формулы как в Calculator)."""
+    revenue = cols['sales_amount_after_spp']
+    net_sold = (
+        cols['sales']
+        - cols['returns']
+        - cols['self_purchase_count']
+        - cols['giveaway_count']
+    )
+    cogs = net_sold * cols['cost_per_unit'] + cols['giveaway_cost']
+    gross_profit = revenue - cogs
+    total_expenses = (
+        cols['logistics_cost']
+        + cols['storage_cost']
+        + cols['penalty_cost']
+        + cols['acceptance_cost']
+        + cols['commission_with_spp']
+        + cols['drr_cost']
+        + cols['marketing_cost']
+        - cols['surcharges']
+    )
+    net_profit = gross_profit - total_expenses
+    
+    return {
+        'cogs': cogs,
+        'gross_profit': gross_profit,
+        'total_expenses': total_expenses,
+        'net_profit': net_profit,
+        'profit_margin_percent': _safe_ratio(gross_profit, revenue) * 100,
+        'roi_percent': _safe_ratio(net_profit, cogs) * 100,
+        'avg_check': _safe_ratio(revenue, cols['sales']),
+    }
+
+_METRIC_NAMES = (
+    'cogs', 'gross_profit', 'total_expenses', 'net_profit',
+    'profit_margin_percent', 'roi_percent', 'avg_check',
+)
+
+if njit is not None:
+    @njit(parallel=True, fastmath=True, cache=True)
+    def _metrics_kernel(sales, returns, self_purchase_count, giveaway_count, cost_per_unit,
+                        giveaway_cost, revenue, logistics_cost, storage_cost, penalty_cost,
+                        acceptance_cost, commission_with_spp, drr_cost, marketing_cost, surcharges,
+                        out_cogs, out_gross_profit, out_total_expenses, out_net_profit,
+                        out_margin, out_roi, out_avg_check):
+        """Все метрики за один проход: промежуточные значения живут в регистрах."""
+        for i in prange(sales.shape[0]):
+            net_sold = sales[i] - returns[i] - self_purchase_count[i] - giveaway_count[i]
+            cogs = net_sold * cost_per_unit[i] + giveaway_cost[i]
+            gross_profit = revenue[i] - cogs
+            total_expenses = (
+                logistics_cost[i] + storage_cost[i] + penalty_cost[i] + acceptance_cost[i]
+                + commission_with_spp[i] + drr_cost[i] + marketing_cost[i] - surcharges[i]
+            )
+            net_profit = gross_profit - total_expenses
+            
+            out_cogs[i] = cogs
+            out_gross_profit[i] = gross_profit
+            out_total_expenses[i] = total_expenses
+            out_net_profit[i] = net_profit
+            
+            # Тернарные выражения LLVM сводит к select без ветвлений - цикл векторизуется
+            out_margin[i] = gross_profit * 100.0 / revenue[i] if revenue[i] != 0.0 else 0.0
+            out_roi[i] = net_profit * 100.0 / cogs if cogs != 0.0 else 0.0
+            out_avg_check[i] = revenue[i] / sales[i] if sales[i] != 0.0 else 0.0
+
+    def _compute_metrics(cols: Dict[str, np.ndarray]) -> Dict[str, np.ndarray]:
+        """Рассчитать все метрики скомпилированным numba-ядром."""
+        n = len(cols['sales'])
+        out = {name: np.empty(n, dtype=np.float64) for name in _METRIC_NAMES}
+        _metrics_kernel(
+            *(cols[name] for name in _BATCH_COLUMNS),
+            *(out[name] for name in _METRIC_NAMES)
+        )
+        return out
+else:
+    _compute_metrics = _compute_metrics_numpy
+
 
 class Calculator:
     """Калькулятор финансовых метрик."""
@@ -11,20 +174,15 @@ class Calculator:
         
         Формула: COGS = (Продажи - Возвраты - Самовыкупы - Раздачи) × Себестоимость/ед
         """
-        net_sold = (
-            product.sales 
-            - product.returns 
-            - product.manual_data.self_purchase_count
-            - product.manual_data.giveaway_count
+        manual = product.manual_data
+        return calc_cogs(
+            product.sales,
+            product.returns,
+            manual.self_purchase_count,
+            manual.giveaway_count,
+            manual.cost_per_unit,
+            manual.giveaway_cost
         )
-        
-        # Себестоимость проданного товара
-        cogs = net_sold * product.manual_data.cost_per_unit
-        
-        # Добавляем себестоимость раздач
-        cogs += product.manual_data.giveaway_cost
-        
-        return cogs
     
     @staticmethod
     def calculate_gross_profit(product: Product, cogs: float) -> float:
@@ -33,7 +191,7 @@ class Calculator:
         
         Формула: Валовая прибыль = Выручка после СПП - COGS
         """
-        return product.sales_amount_after_spp - cogs
+        return calc_gross_profit(product.sales_amount_after_spp, cogs)
     
     @staticmethod
     def calculate_total_expenses(product: Product) -> float:
@@ -42,15 +200,15 @@ class Calculator:
         
         Формула: Расходы = Логистика + Хранение + Штрафы + Приёмка + Комиссия + ДРР + Маркетинг
         """
-        return (
-            product.logistics_cost
-            + product.storage_cost
-            + product.penalty_cost
-            + product.acceptance_cost
-            + product.commission_with_spp
-            + product.drr_cost
-            + product.manual_data.marketing_cost
-            - product.surcharges  # Доплаты вычитаются
+        return calc_total_expenses(
+            product.logistics_cost,
+            product.storage_cost,
+            product.penalty_cost,
+            product.acceptance_cost,
+            product.commission_with_spp,
+            product.drr_cost,
+            product.manual_data.marketing_cost,
+            product.surcharges
         )
     
     @staticmethod
@@ -60,7 +218,7 @@ class Calculator:
         
         Формула: Чистая прибыль = Валовая прибыль - Все расходы
         """
-        return gross_profit - total_expenses
+        return calc_net_profit(gross_profit, total_expenses)
     
     @staticmethod
     def calculate_profit_margin(gross_profit: float, revenue: float) -> float:
@@ -69,9 +227,7 @@ class Calculator:
         
         Формула: Маржа = (Валовая прибыль / Выручка) × 100
         """
-        if revenue == 0:
-            return 0.0
-        return (gross_profit / revenue) * 100
+        return calc_profit_margin(gross_profit, revenue)
     
     @staticmethod
     def calculate_roi(net_profit: float, cogs: float) -> float:
@@ -80,9 +236,7 @@ class Calculator:
         
         Формула: ROI = (Чистая прибыль / COGS) × 100
         """
-        if cogs == 0:
-            return 0.0
-        return (net_profit / cogs) * 100
+        return calc_roi(net_profit, cogs)
     
     @staticmethod
     def calculate_avg_check(revenue: float, sales: int) -> float:
@@ -91,21 +245,29 @@ class Calculator:
         
         Формула: Средний чек = Выручка / Продажи
         """
-        if sales == 0:
-            return 0.0
-        return revenue / sales
+        return calc_avg_check(revenue, sales)
     
     def calculate_all_metrics(self, product: Product) -> ProductMetrics:
         """
         Рассчитать все метрики для товара.
         """
-        cogs = self.calculate_cogs(product)
-        gross_profit = self.calculate_gross_profit(product, cogs)
-        total_expenses = self.calculate_total_expenses(product)
-        net_profit = self.calculate_net_profit(gross_profit, total_expenses)
-        profit_margin = self.calculate_profit_margin(gross_profit, product.sales_amount_after_spp)
-        roi = self.calculate_roi(net_profit, cogs)
-        avg_check = self.calculate_avg_check(product.sales_amount_after_spp, product.sales)
+        manual = product.manual_data
+        revenue = product.sales_amount_after_spp
+        
+        cogs = calc_cogs(
+            product.sales, product.returns, manual.self_purchase_count,
+            manual.giveaway_count, manual.cost_per_unit, manual.giveaway_cost
+        )
+        gross_profit = calc_gross_profit(revenue, cogs)
+        total_expenses = calc_total_expenses(
+            product.logistics_cost, product.storage_cost, product.penalty_cost,
+            product.acceptance_cost, product.commission_with_spp, product.drr_cost,
+            manual.marketing_cost, product.surcharges
+        )
+        net_profit = calc_net_profit(gross_profit, total_expenses)
+        profit_margin = calc_profit_margin(gross_profit, revenue)
+        roi = calc_roi(net_profit, cogs)
+        avg_check = calc_avg_check(revenue, product.sales)
         
         return ProductMetrics(
             product=product,
@@ -116,4 +278,89 @@ class Calculator:
             profit_margin_percent=profit_margin,
             roi_percent=roi,
             avg_check=avg_check
-        )
\ No newline at end of file
+        )
+    
+    def calculate_all_metrics_batch(self, products: Iterable[Product],
+                                    chunk_size: int = 50_000) -> Dict[str, np.ndarray]:
+        """
+        Рассчитать все метрики для товаров векторизованно.
+        
+        Поля товаров раскладываются в параллельные массивы float64,
+        формулы совпадают с calculate_all_metrics. Итератор (например,
+        DataLoader.iter_products) обрабатывается пачками по chunk_size товаров,
+        поэтому объекты Product не накапливаются в памяти.
+        
+        Args:
+            products: Список или итератор товаров
+            chunk_size: Размер пачки для итератора
+            
+        Returns:
+            Словарь {метрика: массив значений} в порядке products
+        """
+        if isinstance(products, Sequence):
+            return self._calculate_chunk(products)
+        
+        iterator = iter(products)
+        chunks = []
+        while chunk := list(islice(iterator, chunk_size)):
+            chunks.append(self._calculate_chunk(chunk))
+        if len(chunks) == 1:
+            return chunks[0]
+        if not chunks:
+            return self._calculate_chunk([])
+        return {name: np.concatenate([c[name] for c in chunks]) for name in _METRIC_NAMES}
+    
+    @staticmethod
+    def _calculate_chunk(products: Sequence) -> Dict[str, np.ndarray]:
+        """Метрики для списка товаров за один векторизованный проход."""
+        n = len(products)
+        cols = {
+            name: np.fromiter(map(getter, products), dtype=np.float64, count=n)
+            for name, getter in _BATCH_COLUMNS.items()
+        }
+        return _compute_metrics(cols)
+    
+    def calculate_frame(self, batch: ProductBatch) -> ProductFrame:
+        """
+        Рассчитать все метрики для пачки товаров в колоночном виде.
+        
+        Args:
+            batch: Пачка товаров (например, из DataLoader.parse_wb_csv_batch)
+            
+        Returns:
+            ProductFrame с массивами метрик в порядке товаров пачки
+        """
+        return ProductFrame(products=batch, **self.calculate_metrics_from_columns(batch.to_columns()))
+    
+    def calculate_metrics_from_columns(self, columns: Any) -> Dict[str, np.ndarray]:
+        """
+        Рассчитать метрики по уже колоночным данным.
+        
+        Принимает словарь массивов, pandas.DataFrame или pyarrow.Table с колонками,
+        названными как поля в _BATCH_COLUMNS (sales, returns, cost_per_unit, ...).
+        Колонки float64 без пропусков передаются в расчёт без копирования;
+        отсутствующие колонки считаются нулевыми.
+        
+        Args:
+            columns: Колоночные данные товаров
+            
+        Returns:
+            Словарь {метрика: массив значений}
+        """
+        names = set(getattr(columns, 'column_names', None) or columns)
+        present = {
+            name: np.ascontiguousarray(np.asarray(columns[name], dtype=np.float64))
+            for name in _BATCH_COLUMNS if name in names
+        }
+        if not present:
+            raise ValueError("Нет ни одной колонки для расчёта метрик")
+        
+        n = len(next(iter(present.values())))
+        zeros = np.zeros(n, dtype=np.float64)
+        cols = {name: present.get(name, zeros) for name in _BATCH_COLUMNS}
+        return _compute_metrics(cols)
+
+@lru_cache(maxsize=None)
+def get_calculator() -> Calculator:
+    """Общий экземпляр Calculator для CLI и сравнения отчётов."""
+    return Calculator()
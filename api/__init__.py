@@ -1,4 +1,4 @@
 """API clients module."""
-from .wb_client import WBAPIClient
+from .wb_client import WBAPIClient, WBAPIError
 
-__all__ = ['WBAPIClient']
\ No newline at end of file
+__all__ = ['WBAPIClient', 'WBAPIError']
\ No newline at end of file
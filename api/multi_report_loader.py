@@ -1,11 +1,73 @@
 """Параллельная загрузка нескольких отчётов WB API."""
 import asyncio
+import logging
+import threading
+import weakref
 import aiohttp
 import json
 from typing import Dict, List, Any, Optional
 from datetime import datetime
 from pathlib import Path
 
+from api.wb_client import RETRY_STATUSES, retry_delay
+
+try:
+    import orjson
+except ImportError:  # orjson опционален: без него используется стандартный json
+    orjson = None
+
+logger = logging.getLogger(__name__)
+
+_loads = orjson.loads if orjson is not None else json.loads
+
+def _dumps(obj: Any) -> bytes:
+    """Компактно сериализовать объект в JSON (UTF-8 байты)."""
+    if orjson is not None:
+        return orjson.dumps(obj, option=orjson.OPT_NON_STR_KEYS)
+    return json.dumps(obj, ensure_ascii=False).encode('utf-8')
+
+# Подстановки дат в шаблонах параметров ENDPOINTS
+DATE_FROM = "{date_from}"  # RFC3339, как передано
+DATE_TO = "{date_to}"
+DAY_FROM = "{day_from}"  # Только дата: YYYY-MM-DD
+DAY_TO = "{day_to}"
+
+# Event loop на поток: синхронные вызовы переиспользуют его вместе с пулом соединений.
+# Loop общий для загрузчиков потока; users - загрузчики, открывшие в нём сессии
+_thread_local = threading.local()
+
+def _get_event_loop(user: Any) -> asyncio.AbstractEventLoop:
+    """Получить (или создать) event loop текущего потока и записать user в его пользователи."""
+    loop = getattr(_thread_local, "loop", None)
+    if loop is None or loop.is_closed():
+        loop = asyncio.new_event_loop()
+        _thread_local.loop = loop
+        _thread_local.users = weakref.WeakSet()
+    _thread_local.users.add(user)
+    return loop
+
+def _release_event_loop(user: Any) -> None:
+    """
+    Убрать user из пользователей event loop текущего потока.
+    
+    Loop закрывается вместе с пулом потоков, только когда его освободил
+    последний пользователь: сессии остальных загрузчиков к нему привязаны.
+    """
+    users = getattr(_thread_local, "users", None)
+    if users is None or user not in users:
+        return
+    users.discard(user)
+    loop = _thread_local.loop
+    if users or loop.is_closed() or loop.is_running():
+        return
+    try:
+        loop.run_until_complete(loop.shutdown_asyncgens())
+        loop.run_until_complete(loop.shutdown_default_executor())
+    finally:
+        loop.close()
+        _thread_local.loop = None
+        _thread_local.users = None
+
 class MultiReportLoader:
     """
     Класс для параллельной загрузки множества отчётов WB API.
@@ -17,55 +79,62 @@ class MultiReportLoader:
         "reportDetail": {
             "name": "Отчёт о реализации (v5)",
             "url": "https://statistics-api.wildberries.ru/api/v5/supplier/reportDetailByPeriod",
-            "params_builder": lambda df, dt: {"dateFrom": df[:10], "dateTo": dt[:10], "limit": 100000}
+            "params": {"dateFrom": DAY_FROM, "dateTo": DAY_TO, "limit": 100000}
         },
         "sales": {
             "name": "Продажи и возвраты",
             "url": "https://statistics-api.wildberries.ru/api/v1/supplier/sales",
-            "params_builder": lambda df, dt: {"dateFrom": df}
+            "params": {"dateFrom": DATE_FROM}
         },
         "orders": {
             "name": "Заказы",
             "url": "https://statistics-api.wildberries.ru/api/v1/supplier/orders",
-            "params_builder": lambda df, dt: {"dateFrom": df}
+            "params": {"dateFrom": DATE_FROM}
         },
         "stocks": {
             "name": "Остатки на складах",
             "url": "https://statistics-api.wildberries.ru/api/v1/supplier/stocks",
-            "params_builder": lambda df, dt: {"dateFrom": df}
+            "params": {"dateFrom": DATE_FROM}
         },
         "incomes": {
             "name": "Поставки",
             "url": "https://statistics-api.wildberries.ru/api/v1/supplier/incomes",
-            "params_builder": lambda df, dt: {"dateFrom": df}
+            "params": {"dateFrom": DATE_FROM}
         },
         "antifraud": {
             "name": "Самовыкупы (30%)",
             "url": "https://statistics-api.wildberries.ru/api/v1/analytics/antifraud-details",
-            "params_builder": lambda df, dt: {"date": dt[:10] if dt else df[:10]}
+            "params": {"date": DAY_TO}
         },
         "penalties": {
             "name": "Габариты/штрафы",
             "url": "https://statistics-api.wildberries.ru/api/v1/analytics/warehouse-measurements",
-            "params_builder": lambda df, dt: {"dateFrom": df, "dateTo": dt, "tab": "penalty", "limit": 1000}
+            "params": {"dateFrom": DATE_FROM, "dateTo": DATE_TO, "tab": "penalty", "limit": 1000}
         },
         "balance": {
             "name": "Баланс продавца",
             "url": "https://statistics-api.wildberries.ru/api/v1/account/balance",
-            "params_builder": lambda df, dt: {}
+            "params": {}
         },
         "region_sales": {
             "name": "Продажи по регионам",
             "url": "https://statistics-api.wildberries.ru/api/v1/analytics/region-sale",
-            "params_builder": lambda df, dt: {"dateFrom": df[:10], "dateTo": dt[:10]}
+            "params": {"dateFrom": DAY_FROM, "dateTo": DAY_TO}
         },
         "excise": {
             "name": "Маркированные товары",
             "url": "https://statistics-api.wildberries.ru/api/v1/analytics/excise-report",
-            "params_builder": lambda df, dt: {"dateFrom": df[:10], "dateTo": dt[:10]}
+            "params": {"dateFrom": DAY_FROM, "dateTo": DAY_TO}
         }
     }
     
+    # Одновременных запросов к WB API и число попыток при 429/5xx
+    MAX_CONCURRENT_REQUESTS = 5
+    MAX_ATTEMPTS = 4
+    
+    # Таймауты запроса (общий, на соединение и на чтение ответа)
+    REQUEST_TIMEOUT = aiohttp.ClientTimeout(total=60, connect=10, sock_read=55)
+    
     def __init__(self, api_key: str):
         """Инициализация с API ключом."""
         self.api_key = api_key
@@ -73,12 +142,69 @@ class MultiReportLoader:
             "Authorization": api_key,
             "Content-Type": "application/json"
         }
+        self._session: Optional[aiohttp.ClientSession] = None
+        self._session_loop: Optional[asyncio.AbstractEventLoop] = None
+        self._semaphore: Optional[asyncio.Semaphore] = None
+        self._params_cache: Dict[tuple, Dict[str, Any]] = {}
+    
+    async def __aenter__(self) -> "MultiReportLoader":
+        return self
+    
+    async def __aexit__(self, exc_type, exc, tb) -> None:
+        await self.aclose()
+    
+    async def _get_session(self) -> aiohttp.ClientSession:
+        """
+        Общая HTTP-сессия с пулом keep-alive соединений.
+        
+        Создаётся лениво, так как коннектор aiohttp привязан к работающему event loop.
+        """
+        loop = asyncio.get_running_loop()
+        if self._session is None or self._session.closed or self._session_loop is not loop:
+            connector = aiohttp.TCPConnector(
+                limit=len(self.ENDPOINTS),
+                ttl_dns_cache=300,
+                keepalive_timeout=60
+            )
+            self._session = aiohttp.ClientSession(
+                connector=connector,
+                headers=self.headers,
+                timeout=self.REQUEST_TIMEOUT
+            )
+            self._session_loop = loop
+            self._semaphore = asyncio.Semaphore(self.MAX_CONCURRENT_REQUESTS)
+        return self._session
+    
+    async def aclose(self) -> None:
+        """Закрыть HTTP-сессию и освободить соединения."""
+        if self._session is not None and not self._session.closed:
+            await self._session.close()
+        self._session = None
+        self._session_loop = None
+    
+    def close(self) -> None:
+        """
+        Синхронно закрыть HTTP-сессию (для сессий, открытых через load_reports_sync).
+        
+        После сессии загрузчик освобождает event loop текущего потока; loop
+        закрывается, когда его не использует ни один загрузчик потока.
+        Следующий синхронный вызов в таком случае создаст новый.
+        """
+        loop = self._session_loop
+        if loop is not None and not loop.is_closed() and not loop.is_running():
+            loop.run_until_complete(self.aclose())
+        _release_event_loop(self)
     
     async def _fetch_report(self, session: aiohttp.ClientSession, report_key: str, 
-                           date_from: str, date_to: str) -> tuple:
+                           dates: Dict[str, str]) -> tuple:
         """
         Загрузить один отчёт асинхронно.
         
+        dates - подстановки дат для шаблона параметров (см. _date_context).
+        Не более MAX_CONCURRENT_REQUESTS запросов выполняются одновременно;
+        при 429/5xx запрос повторяется с паузой (Retry-After или экспоненциальная),
+        на время паузы слот семафора освобождается.
+        
         Returns:
             (report_key, data_or_error)
         """
@@ -87,26 +213,38 @@ class MultiReportLoader:
             return report_key, {"error": "Unknown report type"}
         
         url = endpoint_config["url"]
-        params = endpoint_config["params_builder"](date_from, date_to)
+        params = self._build_params(report_key, dates)
         
         try:
-            async with session.get(url, headers=self.headers, params=params, timeout=60) as response:
-                if response.status == 200:
-                    data = await response.json()
-                    return report_key, {
-                        "name": endpoint_config["name"],
-                        "status": "success",
-                        "count": len(data) if isinstance(data, list) else 1,
-                        "data": data
-                    }
-                else:
-                    text = await response.text()
-                    return report_key, {
-                        "name": endpoint_config["name"],
-                        "status": "error",
-                        "http_code": response.status,
-                        "error": text or f"HTTP {response.status}"
-                    }
+            for attempt in range(self.MAX_ATTEMPTS):
+                # Слот семафора занят только на время запроса: пауза перед
+                # повтором не блокирует загрузку других отчётов
+                async with self._semaphore:
+                    async with session.get(url, params=params) as response:
+                        if response.status in RETRY_STATUSES and attempt < self.MAX_ATTEMPTS - 1:
+                            delay = retry_delay(attempt, response.headers.get("Retry-After"))
+                            logger.warning("%s: HTTP %d, повтор %d/%d через %.1f с",
+                                           report_key, response.status, attempt + 1, self.MAX_ATTEMPTS - 1, delay)
+                        elif response.status == 200:
+                            raw = await response.read()
+                            # Разбор большого JSON - в пуле потоков, чтобы не блокировать event loop
+                            loop = asyncio.get_running_loop()
+                            data = await loop.run_in_executor(None, _loads, raw)
+                            return report_key, {
+                                "name": endpoint_config["name"],
+                                "status": "success",
+                                "count": len(data) if isinstance(data, list) else 1,
+                                "data": data
+                            }
+                        else:
+                            text = await response.text()
+                            return report_key, {
+                                "name": endpoint_config["name"],
+                                "status": "error",
+                                "http_code": response.status,
+                                "error": text or f"HTTP {response.status}"
+                            }
+                await asyncio.sleep(delay)
         except Exception as e:
             return report_key, {
                 "name": endpoint_config["name"],
@@ -114,6 +252,33 @@ class MultiReportLoader:
                 "error": str(e)
             }
     
+    @staticmethod
+    def _date_context(date_from: str, date_to: str) -> Dict[str, str]:
+        """Подстановки дат для шаблонов параметров (срезы дат считаются один раз на загрузку)."""
+        return {
+            DATE_FROM: date_from,
+            DATE_TO: date_to,
+            DAY_FROM: date_from[:10],
+            DAY_TO: date_to[:10],
+        }
+    
+    def _build_params(self, report_key: str, dates: Dict[str, str]) -> Dict[str, Any]:
+        """
+        Параметры запроса отчёта по шаблону из ENDPOINTS.
+        
+        Результат кэшируется по (report_key, date_from, date_to) и переиспользуется
+        при повторах и повторных загрузках за тот же период.
+        """
+        cache_key = (report_key, dates[DATE_FROM], dates[DATE_TO])
+        params = self._params_cache.get(cache_key)
+        if params is None:
+            params = {
+                name: dates.get(value, value) if isinstance(value, str) else value
+                for name, value in self.ENDPOINTS[report_key]["params"].items()
+            }
+            self._params_cache[cache_key] = params
+        return params
+    
     async def fetch_multiple_reports(self, report_keys: List[str], 
                                     date_from: str, date_to: Optional[str] = None) -> Dict[str, Any]:
         """
@@ -130,12 +295,13 @@ class MultiReportLoader:
         if not date_to:
             date_to = date_from
         
-        async with aiohttp.ClientSession() as session:
-            tasks = [
-                self._fetch_report(session, key, date_from, date_to)
-                for key in report_keys
-            ]
-            results = await asyncio.gather(*tasks)
+        session = await self._get_session()
+        dates = self._date_context(date_from, date_to)
+        tasks = [
+            self._fetch_report(session, key, dates)
+            for key in report_keys
+        ]
+        results = await asyncio.gather(*tasks)
         
         return dict(results)
     
@@ -152,7 +318,8 @@ class MultiReportLoader:
         Returns:
             Словарь с результатами всех отчётов
         """
-        return asyncio.run(self.fetch_multiple_reports(report_keys, date_from, date_to))
+        loop = _get_event_loop(self)
+        return loop.run_until_complete(self.fetch_multiple_reports(report_keys, date_from, date_to))
     
     def save_to_json(self, data: Dict[str, Any], output_path: Path) -> None:
         """
@@ -164,18 +331,82 @@ class MultiReportLoader:
         """
         # Добавляем метаданные
         output = {
-            "metadata": {
-                "generated_at": datetime.now().isoformat(),
-                "reports_count": len(data),
-                "reports_loaded": list(data.keys())
-            },
+            "metadata": self._build_metadata(data),
             "reports": data
         }
         
-        with open(output_path, 'w', encoding='utf-8') as f:
-            json.dump(output, f, ensure_ascii=False, indent=2)
+        if orjson is not None:
+            with open(output_path, 'wb') as f:
+                f.write(orjson.dumps(output, option=orjson.OPT_INDENT_2 | orjson.OPT_NON_STR_KEYS))
+        else:
+            with open(output_path, 'w', encoding='utf-8') as f:
+                json.dump(output, f, ensure_ascii=False, indent=2)
         
-        print(f"✅ Данные сохранены: {output_path}")
+        logger.info("Данные сохранены: %s", output_path)
+    
+    def save_to_json_streaming(self, data: Dict[str, Any], output_path: Path) -> None:
+        """
+        Сохранить объединённые результаты в JSON потоково.
+        
+        Общее дерево {"metadata": ..., "reports": ...} не строится: каждый отчёт,
+        а для списков - каждая строка, сериализуется и пишется отдельно.
+        Пиковая память ограничена одной записью. Вывод компактный, без отступов.
+        
+        Args:
+            data: Данные всех отчётов
+            output_path: Путь для сохранения
+        """
+        with open(output_path, 'wb') as f:
+            f.write(b'{"metadata":')
+            f.write(_dumps(self._build_metadata(data)))
+            f.write(b',"reports":{')
+            
+            first = True
+            for key, result in data.items():
+                if not first:
+                    f.write(b',')
+                first = False
+                f.write(_dumps(key))
+                f.write(b':')
+                self._write_report(f, result)
+            
+            f.write(b'}}')
+        
+        logger.info("Данные сохранены: %s", output_path)
+    
+    @staticmethod
+    def _build_metadata(data: Dict[str, Any]) -> Dict[str, Any]:
+        """Метаданные для сохраняемого файла."""
+        return {
+            "generated_at": datetime.now().isoformat(),
+            "reports_count": len(data),
+            "reports_loaded": list(data.keys())
+        }
+    
+    @staticmethod
+    def _write_report(f, result: Dict[str, Any]) -> None:
+        """Записать результат одного отчёта, сериализуя строки data по одной."""
+        rows = result.get("data")
+        if not isinstance(rows, list):
+            f.write(_dumps(result))
+            return
+        
+        f.write(b'{')
+        for key, value in result.items():
+            if key != "data":
+                f.write(_dumps(key))
+                f.write(b':')
+                f.write(_dumps(value))
+                f.write(b',')
+        
+        f.write(b'"data":[')
+        first = True
+        for row in rows:
+            if not first:
+                f.write(b',')
+            first = False
+            f.write(_dumps(row))
+        f.write(b']}')
     
     def print_summary(self, data: Dict[str, Any]) -> None:
         """
@@ -234,6 +465,8 @@ if __name__ == "__main__":
         date_to="2025-10-19T23:59:59Z"
     )
     
+    loader.close()
+    
     # Выводим сводку
     loader.print_summary(results)
     
@@ -1,9 +1,118 @@
 """Wildberries API client with all official endpoints."""
+import json
+import logging
+import random
 import requests
 import time
-from typing import Dict, List, Optional
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+from operator import itemgetter
+from typing import TYPE_CHECKING, Dict, Iterator, List, Optional
 from datetime import datetime, timedelta
 
+try:
+    import orjson
+except ImportError:  # orjson опционален: без него используется стандартный json
+    orjson = None
+
+try:
+    import ijson
+except ImportError:  # ijson опционален: без него ответ разбирается целиком
+    ijson = None
+
+if TYPE_CHECKING:  # только для аннотаций: во время работы pyarrow импортируется по месту
+    import pyarrow as pa
+
+logger = logging.getLogger(__name__)
+
+_loads = orjson.loads if orjson is not None else json.loads
+
+# Временные ошибки WB API, после которых запрос имеет смысл повторить
+RETRY_STATUSES = frozenset({429, 500, 502, 503, 504})
+MAX_RETRY_DELAY = 60.0
+# Потолок экспоненциальной задержки без Retry-After
+MAX_BACKOFF_DELAY = 30.0
+
+# Артикул в строках статистики v1 (продажи, заказы) всегда лежит в ключе nmId
+_sales_nm_id = itemgetter("nmId")
+
+# Сообщения для типовых HTTP-ошибок WB API
+_HTTP_ERRORS = {
+    401: "❌ Ошибка 401: Неверный API ключ",
+    403: "❌ Ошибка 403: Нет доступа к этому ресурсу",
+    429: "❌ Ошибка 429: Превышен лимит запросов",
+}
+
+class WBAPIError(Exception):
+    """Ошибка запроса к WB API."""
+    
+    def __init__(self, message: str, status_code: Optional[int] = None):
+        super().__init__(message)
+        self.status_code = status_code  # HTTP код, если ошибка пришла от сервера
+
+def format_rfc3339(dt: datetime, end_of_day: bool = False) -> str:
+    """
+    Дата в формате RFC3339 для параметров WB API.
+    
+    Args:
+        dt: Дата (время суток не используется)
+        end_of_day: True - конец дня (23:59:59), False - начало (00:00:00)
+        
+    Returns:
+        Строка вида "2025-10-13T00:00:00Z"
+    """
+    time_part = "23:59:59" if end_of_day else "00:00:00"
+    return f"{dt.year:04d}-{dt.month:02d}-{dt.day:02d}T{time_part}Z"
+
+def retry_delay(attempt: int, retry_after: Optional[str] = None) -> float:
+    """
+    Пауза перед повтором запроса (сек).
+    
+    Берётся из заголовка Retry-After, если он задан числом,
+    иначе - экспоненциальная задержка со случайным разбросом до +50%.
+    """
+    if retry_after:
+        try:
+            return min(float(retry_after), MAX_RETRY_DELAY)
+        except ValueError:
+            pass
+    return min(0.5 * 2 ** attempt * (1 + random.random() * 0.5), MAX_BACKOFF_DELAY)
+
+class _CircuitBreaker:
+    """
+    Предохранитель запросов к WB API.
+    
+    После failure_threshold неудач подряд переходит в состояние open и
+    сразу отклоняет запросы. Через cooldown секунд пропускает один пробный
+    запрос (half_open): успех закрывает предохранитель, неудача - снова открывает.
+    """
+    
+    def __init__(self, failure_threshold: int = 5, cooldown: float = 30.0):
+        self.failure_threshold = failure_threshold
+        self.cooldown = cooldown
+        self.state = "closed"
+        self.failure_count = 0
+        self.opened_at = 0.0
+    
+    def allow(self) -> bool:
+        """Можно ли сейчас отправить запрос."""
+        if self.state == "closed":
+            return True
+        if self.state == "open" and time.monotonic() - self.opened_at >= self.cooldown:
+            self.state = "half_open"
+            return True
+        return False
+    
+    def record_success(self) -> None:
+        self.state = "closed"
+        self.failure_count = 0
+    
+    def record_failure(self) -> None:
+        self.failure_count += 1
+        if self.state == "half_open" or self.failure_count >= self.failure_threshold:
+            self.state = "open"
+            self.opened_at = time.monotonic()
+
 class WBAPIClient:
     """
     Клиент для Wildberries Statistics API (v1) и Finance API (v5).
@@ -12,6 +121,39 @@ class WBAPIClient:
     Базовый URL: https://statistics-api.wildberries.ru
     """
     
+    # Число попыток запроса при сетевых ошибках (и при 429/5xx для POST)
+    MAX_ATTEMPTS = 4
+    
+    # Пути эндпоинтов относительно base_url
+    _ENDPOINTS = {
+        "report_detail": "/api/v5/supplier/reportDetailByPeriod",
+        "balance": "/api/v1/account/balance",
+        "incomes": "/api/v1/supplier/incomes",
+        "stocks": "/api/v1/supplier/stocks",
+        "orders": "/api/v1/supplier/orders",
+        "sales": "/api/v1/supplier/sales",
+        "excise_report": "/api/v1/analytics/excise-report",
+        "region_sale": "/api/v1/analytics/region-sale",
+        "warehouse_measurements": "/api/v1/analytics/warehouse-measurements",
+        "antifraud_details": "/api/v1/analytics/antifraud-details",
+        "incorrect_attachments": "/api/v1/analytics/incorrect-attachments",
+        "goods_labeling": "/api/v1/analytics/goods-labeling",
+        "characteristics_change": "/api/v1/analytics/characteristics-change",
+    }
+    
+    # Типы числовых колонок продаж для get_sales_arrow
+    _SALES_ARROW_TYPES = {
+        "nmId": "int64",
+        "incomeID": "int64",
+        "totalPrice": "float64",
+        "discountPercent": "float64",
+        "spp": "float64",
+        "paymentSaleAmount": "float64",
+        "forPay": "float64",
+        "finishedPrice": "float64",
+        "priceWithDisc": "float64",
+    }
+    
     def __init__(self, api_key: str, base_url: str = "https://statistics-api.wildberries.ru"):
         """
         Инициализация API клиента.
@@ -26,6 +168,33 @@ class WBAPIClient:
             "Authorization": api_key,
             "Content-Type": "application/json"
         }
+        # Одна сессия на клиента: keep-alive соединения переиспользуются между запросами
+        self.session = requests.Session()
+        self.session.headers.update(self.headers)
+        # GET-запросы при 429/5xx повторяет urllib3 (с учётом Retry-After),
+        # сетевые ошибки повторяются в _send
+        retry = Retry(total=3, connect=0, read=0, backoff_factor=1.0,
+                      status_forcelist=sorted(RETRY_STATUSES), allowed_methods=["GET"],
+                      respect_retry_after_header=True, raise_on_status=False)
+        adapter = HTTPAdapter(pool_connections=10, pool_maxsize=20, max_retries=retry)
+        self.session.mount("https://", adapter)
+        self.session.mount("http://", adapter)
+        # Общий на все эндпоинты клиента: при недоступности WB запросы отклоняются сразу
+        self._breaker = _CircuitBreaker()
+        # Полные URL эндпоинтов: {путь: base_url + путь}
+        self._url_cache: Dict[str, str] = {}
+        # Продажи, сгруппированные по nm_id: {(date_from, flag): {nm_id: [строки]}}
+        self._sales_by_nm: Dict[tuple, Dict[int, List[Dict]]] = {}
+    
+    def __enter__(self) -> "WBAPIClient":
+        return self
+    
+    def __exit__(self, exc_type, exc, tb) -> None:
+        self.close()
+    
+    def close(self) -> None:
+        """Закрыть HTTP-сессию и её соединения."""
+        self.session.close()
     
     # ========== ГЛАВНЫЙ ФИНАНСОВЫЙ ОТЧЁТ (V5) ==========
     
@@ -67,14 +236,32 @@ class WBAPIClient:
             ... )
             >>> print(f"Загружено {len(report)} записей")
         """
-        endpoint = f"{self.base_url}/api/v5/supplier/reportDetailByPeriod"
         params = {
             "dateFrom": date_from if 'T' in date_from else date_from,
             "dateTo": date_to,
             "limit": min(limit, 100000),
             "rrdid": rrdid
         }
-        return self._make_request(endpoint, params)
+        return self._make_request(self._ENDPOINTS["report_detail"], params)
+    
+    def iter_report_detail_by_period(self, date_from: str, date_to: str,
+                                     limit: int = 100000, rrdid: int = 0) -> Iterator[Dict]:
+        """
+        Потоковая версия get_report_detail_by_period.
+        
+        Строки отчёта разбираются из ответа по одной (ijson) и сразу отдаются,
+        весь список в памяти не хранится.
+        
+        Returns:
+            Итератор строк детализации реализации
+        """
+        params = {
+            "dateFrom": date_from,
+            "dateTo": date_to,
+            "limit": min(limit, 100000),
+            "rrdid": rrdid
+        }
+        return self._iter_request(self._ENDPOINTS["report_detail"], params)
     
     def get_account_balance(self) -> Dict:
         """
@@ -92,8 +279,7 @@ class WBAPIClient:
                 "for_withdraw": 6395.8    # Доступно к выводу
             }
         """
-        endpoint = f"{self.base_url}/api/v1/account/balance"
-        return self._make_request(endpoint, {})
+        return self._make_request(self._ENDPOINTS["balance"], {})
     
     # ========== ОСНОВНЫЕ ОТЧЁТЫ (СТАТИСТИКА) ==========
     
@@ -111,9 +297,8 @@ class WBAPIClient:
         Returns:
             Список поставок
         """
-        endpoint = f"{self.base_url}/api/v1/supplier/incomes"
         params = {"dateFrom": date_from}
-        return self._make_request(endpoint, params)
+        return self._make_request(self._ENDPOINTS["incomes"], params)
     
     def get_stocks(self, date_from: str) -> List[Dict]:
         """
@@ -129,9 +314,8 @@ class WBAPIClient:
         Returns:
             Список остатков
         """
-        endpoint = f"{self.base_url}/api/v1/supplier/stocks"
         params = {"dateFrom": date_from}
-        return self._make_request(endpoint, params)
+        return self._make_request(self._ENDPOINTS["stocks"], params)
     
     def get_orders(self, date_from: str, flag: int = 0) -> List[Dict]:
         """
@@ -149,9 +333,8 @@ class WBAPIClient:
         Returns:
             Список заказов (1 строка = 1 заказ = 1 единица товара)
         """
-        endpoint = f"{self.base_url}/api/v1/supplier/orders"
         params = {"dateFrom": date_from, "flag": flag}
-        return self._make_request(endpoint, params)
+        return self._make_request(self._ENDPOINTS["orders"], params)
     
     def get_sales(self, date_from: str, flag: int = 0) -> List[Dict]:
         """
@@ -169,9 +352,106 @@ class WBAPIClient:
         Returns:
             Список продаж и возвратов (1 строка = 1 заказ = 1 единица)
         """
-        endpoint = f"{self.base_url}/api/v1/supplier/sales"
         params = {"dateFrom": date_from, "flag": flag}
-        return self._make_request(endpoint, params)
+        return self._make_request(self._ENDPOINTS["sales"], params)
+    
+    def iter_sales(self, date_from: str, flag: int = 0) -> Iterator[Dict]:
+        """
+        Потоковая версия get_sales: продажи и возвраты по одной записи.
+        
+        Args:
+            date_from: Дата и время последнего изменения (RFC3339)
+            flag: 0 (по умолчанию) - все продажи, 1 - только новые
+            
+        Returns:
+            Итератор продаж и возвратов
+        """
+        params = {"dateFrom": date_from, "flag": flag}
+        return self._iter_request(self._ENDPOINTS["sales"], params)
+    
+    def get_sales_arrow(self, date_from: str, flag: int = 0, chunk_size: int = 10000) -> "pa.Table":
+        """
+        Продажи в виде колоночной таблицы pyarrow.
+        
+        Строки переводятся в колонки (int64/float64) один раз на границе API,
+        дальше с ними можно работать векторно без Python-объектов на строку.
+        Ответ разбирается потоково и собирается пачками по chunk_size строк.
+        
+        Args:
+            date_from: Дата и время последнего изменения (RFC3339)
+            flag: 0 (по умолчанию) - все продажи, 1 - только новые
+            chunk_size: Размер пачки строк
+            
+        Returns:
+            pyarrow.Table с продажами и возвратами
+        """
+        # pyarrow опционален и нужен только здесь, поэтому импортируется по месту
+        try:
+            import pyarrow as pa
+        except ImportError:
+            raise ImportError("Для get_sales_arrow установите pyarrow: pip install pyarrow") from None
+        
+        tables = []
+        chunk = []
+        for row in self.iter_sales(date_from, flag):
+            chunk.append(row)
+            if len(chunk) >= chunk_size:
+                tables.append(self._rows_to_arrow(chunk))
+                chunk = []
+        if chunk or not tables:
+            tables.append(self._rows_to_arrow(chunk))
+        
+        return pa.concat_tables(tables, promote_options="default")
+    
+    @classmethod
+    def _rows_to_arrow(cls, rows: List[Dict]) -> "pa.Table":
+        """Пачку строк API в таблицу pyarrow с приведением числовых колонок."""
+        import pyarrow as pa
+        
+        table = pa.Table.from_pylist(rows)
+        for name, type_name in cls._SALES_ARROW_TYPES.items():
+            index = table.schema.get_field_index(name)
+            if index >= 0:
+                table = table.set_column(index, name, table.column(index).cast(type_name))
+        return table
+    
+    def prefetch_period(self, date_from: str, flag: int = 0) -> Dict[int, List[Dict]]:
+        """
+        Загрузить продажи за период и сгруппировать их по nm_id.
+        
+        Индекс кэшируется в клиенте, поэтому последующие вызовы
+        get_sales_by_nm_id за тот же период не обращаются к API.
+        
+        Args:
+            date_from: Дата и время последнего изменения (RFC3339)
+            flag: 0 (по умолчанию) - все продажи, 1 - только новые
+            
+        Returns:
+            Словарь {nm_id: список продаж и возвратов}
+        """
+        key = (date_from, flag)
+        index = self._sales_by_nm.get(key)
+        if index is None:
+            index = {}
+            for row in self.iter_sales(date_from, flag):
+                index.setdefault(_sales_nm_id(row), []).append(row)
+            self._sales_by_nm[key] = index
+            logger.info("Продажи с %s: %d артикулов", date_from, len(index))
+        return index
+    
+    def get_sales_by_nm_id(self, nm_id: int, date_from: str, flag: int = 0) -> List[Dict]:
+        """
+        Продажи и возвраты одного артикула WB.
+        
+        Args:
+            nm_id: Артикул WB
+            date_from: Дата и время последнего изменения (RFC3339)
+            flag: 0 (по умолчанию) - все продажи, 1 - только новые
+            
+        Returns:
+            Список продаж и возвратов артикула
+        """
+        return self.prefetch_period(date_from, flag).get(nm_id, [])
     
     # ========== ФИНАНСОВЫЕ ОТЧЁТЫ ==========
     
@@ -189,10 +469,9 @@ class WBAPIClient:
         Returns:
             Отчёт с операциями по маркированным товарам
         """
-        endpoint = f"{self.base_url}/api/v1/analytics/excise-report"
         params = {"dateFrom": date_from, "dateTo": date_to}
         body = {"countries": countries} if countries else {}
-        return self._make_request(endpoint, params, method="POST", json_body=body)
+        return self._make_request(self._ENDPOINTS["excise_report"], params, method="POST", json_body=body)
     
     def get_region_sales(self, date_from: str, date_to: str) -> Dict:
         """
@@ -208,9 +487,8 @@ class WBAPIClient:
         Returns:
             Отчёт по регионам
         """
-        endpoint = f"{self.base_url}/api/v1/analytics/region-sale"
         params = {"dateFrom": date_from, "dateTo": date_to}
-        return self._make_request(endpoint, params)
+        return self._make_request(self._ENDPOINTS["region_sale"], params)
     
     # ========== ОТЧЁТЫ ОБ УДЕРЖАНИЯХ (ШТРАФЫ) ==========
     
@@ -230,7 +508,6 @@ class WBAPIClient:
         Returns:
             Отчёт об удержаниях/замерах
         """
-        endpoint = f"{self.base_url}/api/v1/analytics/warehouse-measurements"
         params = {
             "dateFrom": date_from,
             "dateTo": date_to,
@@ -238,7 +515,7 @@ class WBAPIClient:
             "limit": min(limit, 1000),
             "offset": offset
         }
-        return self._make_request(endpoint, params)
+        return self._make_request(self._ENDPOINTS["warehouse_measurements"], params)
     
     def get_antifraud_details(self, date: Optional[str] = None) -> Dict:
         """
@@ -254,9 +531,8 @@ class WBAPIClient:
         Returns:
             Отчёт об удержаниях за самовыкупы
         """
-        endpoint = f"{self.base_url}/api/v1/analytics/antifraud-details"
         params = {"date": date} if date else {}
-        return self._make_request(endpoint, params)
+        return self._make_request(self._ENDPOINTS["antifraud_details"], params)
     
     def get_incorrect_attachments(self, date_from: str, date_to: str) -> Dict:
         """
@@ -273,9 +549,8 @@ class WBAPIClient:
         Returns:
             Отчёт об удержаниях за подмену
         """
-        endpoint = f"{self.base_url}/api/v1/analytics/incorrect-attachments"
         params = {"dateFrom": date_from, "dateTo": date_to}
-        return self._make_request(endpoint, params)
+        return self._make_request(self._ENDPOINTS["incorrect_attachments"], params)
     
     def get_goods_labeling(self, date_from: str, date_to: str) -> Dict:
         """
@@ -292,9 +567,8 @@ class WBAPIClient:
         Returns:
             Отчёт о штрафах
         """
-        endpoint = f"{self.base_url}/api/v1/analytics/goods-labeling"
         params = {"dateFrom": date_from, "dateTo": date_to}
-        return self._make_request(endpoint, params)
+        return self._make_request(self._ENDPOINTS["goods_labeling"], params)
     
     def get_characteristics_change(self, date_from: str, date_to: str) -> Dict:
         """
@@ -311,44 +585,111 @@ class WBAPIClient:
         Returns:
             Отчёт об удержаниях
         """
-        endpoint = f"{self.base_url}/api/v1/analytics/characteristics-change"
         params = {"dateFrom": date_from, "dateTo": date_to}
-        return self._make_request(endpoint, params)
+        return self._make_request(self._ENDPOINTS["characteristics_change"], params)
     
     # ========== ВСПОМОГАТЕЛЬНЫЕ МЕТОДЫ ==========
     
-    def _make_request(self, endpoint: str, params: Dict, method: str = "GET", json_body: Optional[Dict] = None) -> any:
-        """Выполнить HTTP запрос."""
+    def _send(self, path: str, params: Dict, method: str = "GET",
+              json_body: Optional[Dict] = None, stream: bool = False) -> requests.Response:
+        """
+        Отправить HTTP запрос и вернуть успешный ответ.
+        
+        Обрывы соединения и таймауты повторяются с экспоненциальной задержкой,
+        ответы 4xx (кроме 429) сразу приводят к ошибке.
+        """
+        if method not in ("GET", "POST"):
+            raise ValueError(f"Неподдерживаемый метод: {method}")
+        
+        url = self._url_cache.get(path)
+        if url is None:
+            url = self._url_cache[path] = self.base_url + path
+        
+        if not self._breaker.allow():
+            raise WBAPIError("❌ WB API недоступен, повторите запрос позже")
+        
         try:
-            if method == "GET":
-                response = requests.get(endpoint, headers=self.headers, params=params, timeout=30)
-            elif method == "POST":
-                response = requests.post(endpoint, headers=self.headers, params=params, json=json_body, timeout=30)
-            else:
-                raise ValueError(f"Неподдерживаемый метод: {method}")
+            response = self._send_with_retries(method, url, path, params, json_body, stream)
+        except BaseException:
+            # Любая ошибка считается неудачей: иначе пробный запрос, упавший
+            # не на сети (ChunkedEncodingError и т.п.), оставил бы half_open навсегда
+            self._breaker.record_failure()
+            raise
+        
+        if response.status_code in RETRY_STATUSES:
+            self._breaker.record_failure()
+        else:
+            self._breaker.record_success()
+        response.raise_for_status()
+        return response
+    
+    def _send_with_retries(self, method: str, url: str, path: str, params: Dict,
+                           json_body: Optional[Dict], stream: bool) -> requests.Response:
+        """Отправить запрос, повторяя его при сетевых ошибках (и при 429/5xx для POST)."""
+        last_attempt = self.MAX_ATTEMPTS - 1
+        for attempt in range(self.MAX_ATTEMPTS):
+            try:
+                response = self.session.request(method, url, params=params, json=json_body,
+                                                timeout=30, stream=stream)
+            except (requests.exceptions.ConnectionError, requests.exceptions.Timeout) as e:
+                if attempt == last_attempt:
+                    raise
+                delay = retry_delay(attempt)
+                logger.warning("%s: %s, повтор %d/%d через %.1f с",
+                               path, type(e).__name__, attempt + 1, last_attempt, delay)
+                time.sleep(delay)
+                continue
             
-            response.raise_for_status()
-            return response.json()
+            # GET уже повторён адаптером, вручную повторяем только POST
+            if method == "POST" and response.status_code in RETRY_STATUSES and attempt < last_attempt:
+                delay = retry_delay(attempt, response.headers.get("Retry-After"))
+                logger.warning("%s: HTTP %d, повтор %d/%d через %.1f с",
+                               path, response.status_code, attempt + 1, last_attempt, delay)
+                response.close()
+                time.sleep(delay)
+                continue
             
-        except requests.exceptions.HTTPError as e:
-            if e.response.status_code == 401:
-                raise Exception("❌ Ошибка 401: Неверный API ключ")
-            elif e.response.status_code == 403:
-                raise Exception("❌ Ошибка 403: Нет доступа к этому ресурсу")
-            elif e.response.status_code == 429:
-                raise Exception("❌ Ошибка 429: Превышен лимит запросов")
-            else:
-                raise Exception(f"❌ HTTP ошибка {e.response.status_code}: {e}")
+            return response
+    
+    @staticmethod
+    def _api_error(e: Exception) -> WBAPIError:
+        """Преобразовать ошибку запроса в WBAPIError с понятным сообщением."""
+        if isinstance(e, requests.exceptions.HTTPError):
+            code = e.response.status_code
+            return WBAPIError(_HTTP_ERRORS.get(code) or f"❌ HTTP ошибка {code}: {e}", code)
+        return WBAPIError(f"❌ Ошибка запроса: {e}")
+    
+    def _make_request(self, path: str, params: Dict, method: str = "GET", json_body: Optional[Dict] = None) -> any:
+        """Выполнить HTTP запрос к эндпоинту по его пути."""
+        try:
+            return _loads(self._send(path, params, method, json_body).content)
+        except WBAPIError:
+            raise
+        except Exception as e:
+            raise self._api_error(e) from e
+    
+    def _iter_request(self, path: str, params: Dict) -> Iterator[Dict]:
+        """Выполнить GET запрос и потоково разобрать JSON-массив ответа."""
+        try:
+            response = self._send(path, params, stream=True)
+            with response:
+                if ijson is None:
+                    yield from _loads(response.content) or []
+                    return
+                response.raw.decode_content = True
+                yield from ijson.items(response.raw, 'item', use_float=True)
+        except WBAPIError:
+            raise
         except Exception as e:
-            raise Exception(f"❌ Ошибка запроса: {e}")
+            raise self._api_error(e) from e
     
     def test_connection(self) -> bool:
         """Проверить соединение с API."""
         try:
             # Тестовый запрос с минимальным периодом
-            date_from = (datetime.now() - timedelta(days=1)).strftime("%Y-%m-%dT00:00:00Z")
+            date_from = format_rfc3339(datetime.now() - timedelta(days=1))
             self.get_sales(date_from=date_from)
             return True
         except Exception as e:
-            print(f"❌ Тест не пройден: {e}")
+            logger.warning("Тест соединения не пройден: %s", e)
             return False
\ No newline at end of file
@@ -1,13 +1,12 @@
 """Main CLI application."""
 import sys
-from pathlib import Path
 from typing import List
 from datetime import datetime
 
-from config.config import Config
+from config import get_config
 from api.wb_client import WBAPIClient
 from data.loader import DataLoader
-from analyzer.calculator import Calculator
+from analyzer import get_calculator
 from storage.export import Exporter
 from models.product import Product, ProductMetrics
 from cli.prompts import Prompts
@@ -15,44 +14,44 @@ from cli.prompts import Prompts
 def load_from_api() -> List[Product]:
     """Загрузить данные из WB API."""
     try:
-        Config.validate()
+        config = get_config()
+        config.validate()
         print("\n🔗 Подключение к WB API...")
         
-        client = WBAPIClient(Config.WB_API_KEY, Config.WB_API_URL)
-        
         # Запрашиваем дату начала в формате RFC3339
         print("\n📅 Формат даты: YYYY-MM-DDTHH:MM:SSZ (RFC3339)")
         print("Пример: 2025-10-13T00:00:00Z")
         
         date_from = Prompts.get_string_input(
             "Дата начала (RFC3339)", 
-            f"{Config.DATE_FROM}T00:00:00Z"
+            f"{config.DATE_FROM}T00:00:00Z"
         )
         
         print("\n⏳ Загрузка данных о продажах...")
         print("💡 WB API обновляет данные раз в 30 минут")
         
         # Вызываем API с правильным количеством аргументов
-        sales_data = client.get_sales(date_from=date_from)
+        with WBAPIClient(config.WB_API_KEY, config.WB_API_URL) as client:
+            sales_data = client.get_sales(date_from=date_from)
         
         if not sales_data:
-            print("⚠️  Данные не найдены")
-            print("💡 Попробуйте:")
-            print("   - Изменить дату начала")
-            print("   - Проверить API ключ в .env")
-            print("   - Убедиться, что есть продажи за этот период")
+            print("⚠️  Данные не найдены\n"
+                  "💡 Попробуйте:\n"
+                  "   - Изменить дату начала\n"
+                  "   - Проверить API ключ в .env\n"
+                  "   - Убедиться, что есть продажи за этот период")
             return []
         
         print(f"✅ Загружено {len(sales_data)} записей")
         
         # Показываем пример полей
         if sales_data:
-            print("\n🔑 Доступные поля в данных:")
-            for key in list(sales_data[0].keys())[:10]:
-                value = sales_data[0].get(key)
-                print(f"  - {key}: {value}")
-            if len(sales_data[0].keys()) > 10:
-                print(f"  ... и ещё {len(sales_data[0].keys()) - 10} полей")
+            first = sales_data[0]
+            lines = ["\n🔑 Доступные поля в данных:"]
+            lines.extend(f"  - {key}: {value}" for key, value in list(first.items())[:10])
+            if len(first) > 10:
+                lines.append(f"  ... и ещё {len(first) - 10} полей")
+            print("\n".join(lines))
         
         # TODO: Преобразовать данные WB API в Product
         print("\n⚠️  Преобразование данных WB API в Product ещё не реализовано")
@@ -68,13 +67,13 @@ def load_from_csv() -> List[Product]:
     try:
         file_path = Prompts.get_string_input("Путь к CSV файлу", "data_samples/43-nedelia-2-List1.csv")
         
-        if not Path(file_path).exists():
+        print("\n⏳ Загрузка CSV...")
+        try:
+            data = DataLoader.load_from_csv(file_path)
+        except FileNotFoundError:
             print(f"❌ Файл не найден: {file_path}")
             return []
         
-        print("\n⏳ Загрузка CSV...")
-        data = DataLoader.load_from_csv(file_path)
-        
         if not data:
             print("⚠️  CSV пуст")
             return []
@@ -100,13 +99,13 @@ def load_from_json() -> List[Product]:
     try:
         file_path = Prompts.get_string_input("Путь к JSON файлу", "data_samples/test.txt")
         
-        if not Path(file_path).exists():
+        print("\n⏳ Загрузка JSON...")
+        try:
+            data = DataLoader.load_from_json(file_path)
+        except FileNotFoundError:
             print(f"❌ Файл не найден: {file_path}")
             return []
         
-        print("\n⏳ Загрузка JSON...")
-        data = DataLoader.load_from_json(file_path)
-        
         print(f"✅ Загружено {len(data)} записей")
         
         # TODO: Реализовать парсинг JSON в Product
@@ -123,7 +122,7 @@ def process_products(products: List[Product]) -> List[ProductMetrics]:
     
     print("\n📊 Расчёт метрик...")
     
-    calculator = Calculator()
+    calculator = get_calculator()
     metrics = [calculator.calculate_all_metrics(p) for p in products]
     
     print(f"✅ Метрики рассчитаны для {len(metrics)} товаров")
@@ -135,14 +134,15 @@ def export_results(metrics: List[ProductMetrics]):
     if not metrics:
         return
     
-    Config.ensure_output_dir()
+    config = get_config()
+    config.ensure_output_dir()
     
     # Экспорт в JSON
-    json_path = Config.OUTPUT_DIR / "report.json"
+    json_path = config.OUTPUT_DIR / "report.json"
     Exporter.export_to_json(metrics, json_path)
     
     # Экспорт в CSV
-    csv_path = Config.OUTPUT_DIR / "report.csv"
+    csv_path = config.OUTPUT_DIR / "report.csv"
     Exporter.export_to_csv(metrics, csv_path)
     
     # Вывод сводки
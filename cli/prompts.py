@@ -1,27 +1,54 @@
 """Interactive prompts for CLI."""
+import re
 from typing import Optional
 from models.product import ManualInputData
 
+# Обычная запись чисел: такие ответы преобразуются без перехвата исключений
+_INT_RE = re.compile(r"[+-]?\d+")
+_FLOAT_RE = re.compile(r"[+-]?(?:\d+\.?\d*|\.\d+)(?:[eE][+-]?\d+)?")
+
+# Главное меню выводится одним вызовом print
+_MENU = "\n".join([
+    "\n" + "=" * 60,
+    "📈 WB ANALYTICS - ГЛАВНОЕ МЕНЮ",
+    "=" * 60,
+    "\n1️⃣  Загрузить данные из WB API",
+    "2️⃣  Загрузить данные из CSV",
+    "3️⃣  Загрузить данные из JSON",
+    "4️⃣  Выйти",
+])
+
 class Prompts:
     """Интерактивные запросы для CLI."""
     
     @staticmethod
     def get_float_input(prompt: str, default: float = 0.0) -> float:
         """Получить float значение от пользователя."""
+        text = f"{prompt} [{default}]: "
         while True:
+            value = input(text).strip()
+            if not value:
+                return default
+            if _FLOAT_RE.fullmatch(value):
+                return float(value)
+            # Редкие формы (inf, 1_000) разбирает сам float
             try:
-                value = input(f"{prompt} [{default}]: ").strip()
-                return float(value) if value else default
+                return float(value)
             except ValueError:
                 print("❌ Неверное значение. Попробуйте снова.")
     
     @staticmethod
     def get_int_input(prompt: str, default: int = 0) -> int:
         """Получить int значение от пользователя."""
+        text = f"{prompt} [{default}]: "
         while True:
+            value = input(text).strip()
+            if not value:
+                return default
+            if _INT_RE.fullmatch(value):
+                return int(value)
             try:
-                value = input(f"{prompt} [{default}]: ").strip()
-                return int(value) if value else default
+                return int(value)
             except ValueError:
                 print("❌ Неверное значение. Попробуйте снова.")
     
@@ -61,12 +88,6 @@ class Prompts:
     @staticmethod
     def display_menu() -> str:
         """Отобразить главное меню."""
-        print("\n" + "="*60)
-        print("📈 WB ANALYTICS - ГЛАВНОЕ МЕНЮ")
-        print("="*60)
-        print("\n1️⃣  Загрузить данные из WB API")
-        print("2️⃣  Загрузить данные из CSV")
-        print("3️⃣  Загрузить данные из JSON")
-        print("4️⃣  Выйти")
+        print(_MENU)
         
         return input("\nВыберите опцию [1-4]: ").strip()
\ No newline at end of file
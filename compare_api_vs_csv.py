@@ -22,20 +22,63 @@
 4. Сравнивает результаты и показывает расхождения
 """
 
-import os
+import re
 import sys
 import json
 import argparse
 import pandas as pd
+from itertools import islice
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
 from datetime import datetime, timedelta
-from dotenv import load_dotenv
 
 # Добавляем корневую директорию в PYTHONPATH
 sys.path.insert(0, str(Path(__file__).parent))
 
 from api.multi_report_loader import MultiReportLoader
-from analyzer.calculator import Calculator
+from api.wb_client import format_rfc3339
+from analyzer import get_calculator
+from config import get_config
+
+try:
+    import orjson
+except ImportError:  # orjson опционален: без него используется стандартный json
+    orjson = None
+
+try:
+    import pyarrow as pa
+    import pyarrow.csv as pa_csv
+except ImportError:  # pyarrow опционален: без него CSV читается движком pandas
+    pa_csv = None
+
+# Колонки CSV отчёта WB по позициям (по примеру из файла)
+CSV_COLUMNS = {
+    2: "nm_id",            # Артикул ВБ
+    3: "seller_article",   # Артикул продавца
+    5: "name",             # НазваниеГруппы
+    9: "quantity",         # Продажи (количество)
+    48: "to_pay",          # К перечислению за товар
+}
+CSV_NUMERIC_COLUMNS = ("quantity", "to_pay")
+# Строк с комментариями перед заголовком CSV отчёта
+CSV_COMMENT_ROWS = 8
+# Пробелы (в том числе неразрывные), символы рубля и процента в числах отчёта
+CSV_NUMBER_JUNK = re.compile(r"[\s₽%]")
+
+# Поля отчёта о реализации (v5), агрегируемые по nm_id
+API_TEXT_COLUMNS = ("subject_name", "brand_name")
+API_NUMERIC_COLUMNS = (
+    "quantity",
+    "ppvz_for_pay",            # К выплате
+    "retail_amount",           # Выручка
+    "ppvz_sales_commission",   # Комиссия
+    "delivery_rub",            # Логистика
+    "storage_fee",             # Хранение
+    "penalty",                 # Штрафы
+    "acceptance",              # Приёмка
+)
+# Строк отчёта в одной пачке при агрегации
+API_CHUNK_ROWS = 50_000
 
 
 class DataComparator:
@@ -49,7 +92,7 @@ class DataComparator:
             api_key: WB API ключ
         """
         self.loader = MultiReportLoader(api_key)
-        self.calculator = Calculator()
+        self.calculator = get_calculator()
     
     def load_api_data(self, date_from: str, date_to: str, reports: list = None):
         """
@@ -89,22 +132,77 @@ class DataComparator:
         Returns:
             DataFrame с данными из CSV
         """
-        print(f"\n📄 Загрузка CSV: {csv_path}")
+        df, total_columns = self.read_csv_report(csv_path)
+        self.print_csv_summary(csv_path, df, total_columns)
+        return df
+    
+    @staticmethod
+    def print_csv_summary(csv_path: Path, df: pd.DataFrame, total_columns: int):
+        """Вывести итоги загрузки CSV одним print."""
+        print(f"\n📄 Загрузка CSV: {csv_path}\n"
+              f"   Загружено строк: {len(df)}\n"
+              f"   Колонок в отчёте: {total_columns}")
+    
+    @staticmethod
+    def read_csv_report(csv_path: Path):
+        """
+        Прочитать нужные колонки CSV файла WB без вывода в консоль.
+        
+        Можно вызывать в фоновом потоке: итоги выводит print_csv_summary.
         
-        # Читаем CSV, пропуская первые строки с комментариями
-        df = pd.read_csv(csv_path, skiprows=8, encoding='utf-8')
+        Args:
+            csv_path: Путь к CSV файлу
+            
+        Returns:
+            (DataFrame с данными из CSV, число колонок в отчёте)
+        """
+        # Читаем CSV, пропуская первые строки с комментариями.
+        # Колонки выбираем по позициям: в отчёте WB названия повторяются
+        # (несколько "Продажи"), и по именам их не различить
+        header = pd.read_csv(csv_path, skiprows=CSV_COMMENT_ROWS, encoding='utf-8', nrows=0).columns
+        positions = [i for i in CSV_COLUMNS if i < len(header)]
         
-        print(f"   Загружено строк: {len(df)}")
-        print(f"   Колонок: {len(df.columns)}")
+        # Только нужные колонки и без вывода типов: все значения читаются строками
+        df = None
+        if pa_csv is not None:
+            # Заголовок пропускаем и называем колонки их номерами
+            names = [str(i) for i in range(len(header))]
+            usecols = [names[i] for i in positions]
+            try:
+                table = pa_csv.read_csv(
+                    csv_path,
+                    read_options=pa_csv.ReadOptions(
+                        skip_rows=CSV_COMMENT_ROWS + 1, column_names=names, encoding='utf-8'
+                    ),
+                    convert_options=pa_csv.ConvertOptions(
+                        include_columns=usecols,
+                        column_types=dict.fromkeys(usecols, pa.string()),
+                        strings_can_be_null=True,
+                    ),
+                )
+            except pa.ArrowInvalid:
+                # Короткие строки (например, итоговая) pyarrow не принимает -
+                # такой файл читает pandas, дополняя их пустыми значениями
+                pass
+            else:
+                df = table.to_pandas()
+                df.columns = positions
+        if df is None:
+            df = pd.read_csv(
+                csv_path, skiprows=CSV_COMMENT_ROWS + 1, header=None, encoding='utf-8',
+                usecols=positions, dtype=str,
+            )
         
-        return df
+        df = df[positions].rename(columns=CSV_COLUMNS)
+        return df, len(header)
     
     def calculate_metrics_from_api(self, api_data: dict):
         """
         Рассчитать метрики из данных API.
         
         Args:
-            api_data: Данные из WB API
+            api_data: Данные из WB API. Строки отчёта ("data") могут быть списком
+                или итератором (например, WBAPIClient.iter_report_detail_by_period)
             
         Returns:
             Словарь с рассчитанными метриками
@@ -116,45 +214,15 @@ class DataComparator:
         # Если есть главный отчёт о реализации (v5)
         if "reportDetail" in api_data and api_data["reportDetail"]["status"] == "success":
             report_data = api_data["reportDetail"]["data"]
+            grouped = self._aggregate_api_rows(report_data or [])
             
-            if report_data and len(report_data) > 0:
-                # Группируем по nm_id (артикулу)
-                by_article = {}
-                
-                for row in report_data:
-                    nm_id = row.get("nm_id")
-                    if not nm_id:
-                        continue
-                    
-                    if nm_id not in by_article:
-                        by_article[nm_id] = {
-                            "nm_id": nm_id,
-                            "subject_name": row.get("subject_name", ""),
-                            "brand_name": row.get("brand_name", ""),
-                            "quantity": 0,
-                            "ppvz_for_pay": 0,  # К выплате
-                            "retail_amount": 0,  # Выручка
-                            "ppvz_sales_commission": 0,  # Комиссия
-                            "delivery_rub": 0,  # Логистика
-                            "storage_fee": 0,  # Хранение
-                            "penalty": 0,  # Штрафы
-                            "acceptance": 0,  # Приёмка
-                        }
-                    
-                    # Суммируем показатели
-                    by_article[nm_id]["quantity"] += row.get("quantity", 0)
-                    by_article[nm_id]["ppvz_for_pay"] += row.get("ppvz_for_pay", 0)
-                    by_article[nm_id]["retail_amount"] += row.get("retail_amount", 0)
-                    by_article[nm_id]["ppvz_sales_commission"] += row.get("ppvz_sales_commission", 0)
-                    by_article[nm_id]["delivery_rub"] += row.get("delivery_rub", 0)
-                    by_article[nm_id]["storage_fee"] += row.get("storage_fee", 0)
-                    by_article[nm_id]["penalty"] += row.get("penalty", 0)
-                    by_article[nm_id]["acceptance"] += row.get("acceptance", 0)
+            if grouped is not None:
+                grouped.insert(0, "nm_id", grouped.index)
                 
-                metrics["by_article"] = by_article
-                metrics["total_articles"] = len(by_article)
-                metrics["total_quantity"] = sum(a["quantity"] for a in by_article.values())
-                metrics["total_to_pay"] = sum(a["ppvz_for_pay"] for a in by_article.values())
+                metrics["by_article"] = grouped.to_dict("index")
+                metrics["total_articles"] = len(grouped)
+                metrics["total_quantity"] = grouped["quantity"].sum().item()
+                metrics["total_to_pay"] = grouped["ppvz_for_pay"].sum().item()
                 
                 print(f"   ✅ Всего артикулов: {metrics['total_articles']}")
                 print(f"   ✅ Всего продаж: {metrics['total_quantity']} шт")
@@ -162,54 +230,89 @@ class DataComparator:
         
         return metrics
     
+    @staticmethod
+    def _aggregate_api_rows(rows):
+        """
+        Сгруппировать строки отчёта о реализации по nm_id.
+        
+        Строки обрабатываются пачками по API_CHUNK_ROWS, поэтому в памяти
+        одновременно находятся только пачка и частичные суммы по артикулам.
+        
+        Args:
+            rows: Список или итератор строк отчёта
+            
+        Returns:
+            DataFrame с индексом nm_id или None, если строк нет
+        """
+        text_columns = list(API_TEXT_COLUMNS)
+        numeric_columns = list(API_NUMERIC_COLUMNS)
+        aggregation = {**dict.fromkeys(text_columns, "first"), **dict.fromkeys(numeric_columns, "sum")}
+        
+        rows = iter(rows)
+        partials = []
+        while chunk := list(islice(rows, API_CHUNK_ROWS)):
+            df = pd.DataFrame.from_records(chunk, columns=["nm_id", *text_columns, *numeric_columns])
+            df["nm_id"] = pd.to_numeric(df["nm_id"], errors="coerce").fillna(0).astype("int64")
+            df[text_columns] = df[text_columns].fillna("")
+            df[numeric_columns] = df[numeric_columns].apply(pd.to_numeric, errors="coerce").fillna(0)
+            df = df[df["nm_id"] != 0]  # Строки без артикула пропускаем
+            
+            partials.append(df.groupby("nm_id", sort=False).agg(aggregation))
+        
+        if not partials:
+            return None
+        if len(partials) == 1:
+            return partials[0]
+        # Частичные суммы пачек сводим тем же способом
+        return pd.concat(partials).groupby(level=0, sort=False).agg(aggregation)
+    
     def calculate_metrics_from_csv(self, df: pd.DataFrame):
         """
         Рассчитать метрики из CSV данных.
         
         Args:
-            df: DataFrame с данными из CSV
+            df: DataFrame с данными из CSV (из load_csv_data или полный отчёт WB)
             
         Returns:
             Словарь с рассчитанными метриками
         """
         print("\n🧮 Расчёт метрик из CSV...")
         
-        # Очищаем DataFrame от пустых строк и комментариев
-        df = df[df.iloc[:, 2].notna()]  # Артикул ВБ не должен быть пустым
-        df = df[df.iloc[:, 2] != '-1']  # Исключаем "Нераспределенное"
+        if "nm_id" in df.columns:
+            # Колонки уже названы (load_csv_data)
+            columns = {name: name for name in CSV_COLUMNS.values() if name in df.columns}
+        else:
+            # Полный отчёт: берём нужные колонки по позициям и даём им имена
+            columns = {df.columns[i]: name for i, name in CSV_COLUMNS.items() if i < len(df.columns)}
+        df = df[list(columns)].rename(columns=columns)
+        for name in CSV_COLUMNS.values():
+            if name not in df.columns:
+                df[name] = 0.0 if name in CSV_NUMERIC_COLUMNS else ""
         
-        metrics = {}
-        by_article = {}
+        df["nm_id"] = df["nm_id"].astype(str).str.strip()
+        df["seller_article"] = df["seller_article"].astype(str)
+        df["name"] = df["name"].astype(str)
+        for name in CSV_NUMERIC_COLUMNS:
+            df[name] = self._to_numeric(df[name])
         
-        # Предполагаемая структура колонок (по примеру из файла)
-        # Колонка 2: Артикул ВБ (nm_id)
-        # Колонка 3: Артикул продавца
-        # Колонка 5: НазваниеГруппы
-        # Колонка 9: Продажи (количество)
-        # Колонка 48: К перечислению за товар
+        # Очищаем от пустых строк, комментариев и "Нераспределенного" (-1)
+        df = df[~df["nm_id"].isin(("", "nan", "-1"))]
         
-        for idx, row in df.iterrows():
-            try:
-                nm_id = str(row.iloc[2]).strip()  # Артикул ВБ
-                if not nm_id or nm_id == 'nan':
-                    continue
-                
-                article = {
-                    "nm_id": nm_id,
-                    "seller_article": str(row.iloc[3]) if len(row) > 3 else "",
-                    "name": str(row.iloc[5]) if len(row) > 5 else "",
-                    "quantity": self._safe_float(row.iloc[9]) if len(row) > 9 else 0,
-                    "to_pay": self._safe_float(row.iloc[48]) if len(row) > 48 else 0,
-                }
-                
-                by_article[nm_id] = article
-            except Exception as e:
-                continue
+        # Строки одного артикула суммируются, как и в calculate_metrics_from_api;
+        # артикул продавца и название берутся из первой строки
+        grouped = df.groupby("nm_id", sort=False).agg(
+            seller_article=("seller_article", "first"),
+            name=("name", "first"),
+            quantity=("quantity", "sum"),
+            to_pay=("to_pay", "sum"),
+        )
+        grouped.insert(0, "nm_id", grouped.index)
         
-        metrics["by_article"] = by_article
-        metrics["total_articles"] = len(by_article)
-        metrics["total_quantity"] = sum(a["quantity"] for a in by_article.values())
-        metrics["total_to_pay"] = sum(a["to_pay"] for a in by_article.values())
+        metrics = {}
+        metrics["by_article"] = grouped.to_dict("index")
+        metrics["total_articles"] = len(grouped)
+        metrics["total_quantity"] = float(grouped["quantity"].sum())
+        metrics["total_to_pay"] = float(grouped["to_pay"].sum())
         
         print(f"   ✅ Всего артикулов: {metrics['total_articles']}")
         print(f"   ✅ Всего продаж: {metrics['total_quantity']:.0f} шт")
@@ -276,17 +379,15 @@ class DataComparator:
         print(f"   CSV: {csv_val:,.2f}")
         print(f"   Разница: {diff:+,.2f} ({diff_pct:+.1f}%)")
     
-    def _safe_float(self, value):
-        """Безопасное преобразование в float."""
-        try:
-            if pd.isna(value):
-                return 0.0
-            if isinstance(value, str):
-                # Удаляем пробелы, запятые, символы валют
-                value = value.replace(' ', '').replace(',', '.').replace('₽', '').replace('%', '')
-            return float(value)
-        except:
-            return 0.0
+    @staticmethod
+    def _to_numeric(column: pd.Series) -> pd.Series:
+        """Безопасное преобразование колонки в float (нечисловые значения -> 0)."""
+        # Цены и количества в отчёте сильно повторяются: разбираем только уникальные значения
+        codes, uniques = pd.factorize(column, use_na_sentinel=False)
+        # Удаляем пробелы и символы валют, десятичная запятая -> точка
+        text = pd.Series(uniques).astype(str).str.replace(CSV_NUMBER_JUNK, "", regex=True)
+        values = pd.to_numeric(text.str.replace(",", ".", regex=False), errors="coerce").fillna(0.0)
+        return pd.Series(values.to_numpy()[codes], index=column.index)
     
     def save_comparison_report(self, api_metrics: dict, csv_metrics: dict, output_path: Path):
         """
@@ -308,8 +409,14 @@ class DataComparator:
             }
         }
         
-        with open(output_path, 'w', encoding='utf-8') as f:
-            json.dump(report, f, ensure_ascii=False, indent=2)
+        if orjson is not None:
+            # numpy-скаляры из агрегаций pandas orjson сериализует сам
+            options = orjson.OPT_INDENT_2 | orjson.OPT_NON_STR_KEYS | orjson.OPT_SERIALIZE_NUMPY
+            with open(output_path, 'wb') as f:
+                f.write(orjson.dumps(report, option=options))
+        else:
+            with open(output_path, 'w', encoding='utf-8') as f:
+                json.dump(report, f, ensure_ascii=False, indent=2)
         
         print(f"\n💾 Отчёт сохранён: {output_path}")
 
@@ -368,10 +475,8 @@ def main():
     print("📊 СРАВНЕНИЕ ДАННЫХ WB API vs CSV")
     print("="*70)
     
-    # Загружаем переменные окружения
-    load_dotenv()
-    
-    api_key = os.getenv("WB_API_KEY")
+    # Настройки из переменных окружения и .env
+    api_key = get_config().WB_API_KEY
     if not api_key:
         print("\n❌ Ошибка: WB_API_KEY не найден в .env файле")
         print("💡 Создайте .env файл и добавьте: WB_API_KEY=ваш_ключ\n")
@@ -390,22 +495,10 @@ def main():
         date_to = datetime.now()
         date_from = date_to - timedelta(days=7)
     
-    date_from_str = date_from.strftime("%Y-%m-%dT00:00:00Z")
-    date_to_str = date_to.strftime("%Y-%m-%dT23:59:59Z")
+    date_from_str = format_rfc3339(date_from)
+    date_to_str = format_rfc3339(date_to, end_of_day=True)
     
-    # 1. Загружаем данные из API
-    try:
-        api_data = comparator.load_api_data(
-            date_from=date_from_str,
-            date_to=date_to_str,
-            reports=["reportDetail"]  # Главный отчёт
-        )
-    except Exception as e:
-        print(f"\n❌ Ошибка загрузки из API: {e}")
-        print("💡 Проверьте API ключ и подождите 1-2 минуты (rate limit)\n")
-        return
-    
-    # 2. Загружаем данные из CSV
+    # CSV проверяем до обращения к API, чтобы не ждать загрузку впустую
     csv_path = Path(args.csv_file)
     
     if not csv_path.exists():
@@ -414,11 +507,31 @@ def main():
         print(f"   Пример: python compare_api_vs_csv.py --csv data_samples/ваш_файл.csv\n")
         return
     
-    try:
-        csv_data = comparator.load_csv_data(csv_path)
-    except Exception as e:
-        print(f"\n❌ Ошибка загрузки CSV: {e}\n")
-        return
+    with ThreadPoolExecutor(max_workers=1) as executor:
+        # 2. CSV читается в фоне, пока идёт загрузка из API; поток ничего
+        # не печатает, итоги CSV выводятся после загрузки API
+        csv_future = executor.submit(comparator.read_csv_report, csv_path)
+        
+        # 1. Загружаем данные из API
+        try:
+            api_data = comparator.load_api_data(
+                date_from=date_from_str,
+                date_to=date_to_str,
+                reports=["reportDetail"]  # Главный отчёт
+            )
+        except Exception as e:
+            print(f"\n❌ Ошибка загрузки из API: {e}")
+            print("💡 Проверьте API ключ и подождите 1-2 минуты (rate limit)\n")
+            return
+        finally:
+            comparator.loader.close()
+        
+        try:
+            csv_data, csv_columns = csv_future.result()
+        except Exception as e:
+            print(f"\n❌ Ошибка загрузки CSV: {e}\n")
+            return
+        comparator.print_csv_summary(csv_path, csv_data, csv_columns)
     
     # 3. Рассчитываем метрики
     api_metrics = comparator.calculate_metrics_from_api(api_data)
@@ -1,4 +1,4 @@
 """Configuration module."""
-from .config import Config
+from .config import Config, get_config
 
-__all__ = ['Config']
\ No newline at end of file
+__all__ = ['Config', 'get_config']
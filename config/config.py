@@ -1,25 +1,64 @@
 """Configuration management."""
 import os
+from functools import cached_property, lru_cache
 from pathlib import Path
 from dotenv import load_dotenv
 
-# Load environment variables
-load_dotenv()
+# .env читается один раз на процесс, сколько бы модулей ни запрашивали конфигурацию
+_env_loaded = False
+
+def _load_env() -> None:
+    """Load environment variables from .env (only on the first call)."""
+    global _env_loaded
+    if not _env_loaded:
+        load_dotenv(override=False)
+        _env_loaded = True
+
+class _Setting(cached_property):
+    """
+    cached_property настройки, доступная и у класса.
+    
+    Config.WB_API_KEY (как до перехода на get_config) читает значение
+    общего экземпляра get_config(), а не возвращает сам дескриптор.
+    """
+    
+    def __get__(self, instance, owner=None):
+        if instance is None:
+            instance = get_config()
+        return super().__get__(instance, owner)
 
 class Config:
     """Application configuration."""
     
+    def __init__(self):
+        _load_env()
+    
     # WB API settings
-    WB_API_KEY = os.getenv('WB_API_KEY', '')
-    WB_API_URL = os.getenv('WB_API_URL', 'https://statistics-api.wildberries.ru')
+    @_Setting
+    def WB_API_KEY(self) -> str:
+        return os.getenv('WB_API_KEY', '')
+    
+    @_Setting
+    def WB_API_URL(self) -> str:
+        return os.getenv('WB_API_URL', 'https://statistics-api.wildberries.ru')
     
     # Date filters
-    DATE_FROM = os.getenv('DATE_FROM', '2025-10-13')
-    DATE_TO = os.getenv('DATE_TO', '2025-10-19')
+    @_Setting
+    def DATE_FROM(self) -> str:
+        return os.getenv('DATE_FROM', '2025-10-13')
+    
+    @_Setting
+    def DATE_TO(self) -> str:
+        return os.getenv('DATE_TO', '2025-10-19')
     
     # Export settings
-    OUTPUT_DIR = Path(os.getenv('OUTPUT_DIR', 'output'))
-    EXPORT_FORMAT = os.getenv('EXPORT_FORMAT', 'json')
+    @_Setting
+    def OUTPUT_DIR(self) -> Path:
+        return Path(os.getenv('OUTPUT_DIR', 'output'))
+    
+    @_Setting
+    def EXPORT_FORMAT(self) -> str:
+        return os.getenv('EXPORT_FORMAT', 'json')
     
     @classmethod
     def validate(cls):
@@ -43,4 +82,9 @@ class Config:
         print(f"Период: {cls.DATE_FROM} - {cls.DATE_TO}")
         print(f"Выходная папка: {cls.OUTPUT_DIR}")
         print(f"Формат экспорта: {cls.EXPORT_FORMAT}")
-        print("=" * 50)
\ No newline at end of file
+        print("=" * 50)
+
+@lru_cache(maxsize=None)
+def get_config() -> Config:
+    """Get the shared configuration instance (created on the first call)."""
+    return Config()
@@ -1,10 +1,133 @@
 """Data loading from various sources."""
 import json
 import csv
-import pandas as pd
-from typing import List, Dict, Optional
+import os
+import sys
+import tempfile
+from functools import lru_cache
+from importlib.util import find_spec
+from typing import Any, Callable, Dict, Iterable, Iterator, List, Optional, Tuple
 from pathlib import Path
-from models.product import Product, ManualInputData
+
+import numpy as np
+
+from models.product import (
+    BATCH_FLOAT_FIELDS, BATCH_INT_FIELDS, ManualInputData, Product, ProductBatch,
+)
+
+try:
+    import orjson
+except ImportError:  # orjson опционален: без него используется стандартный json
+    orjson = None
+
+# pyarrow опционален: без него CSV читается модулем csv. Импорт тяжёлый,
+# поэтому pyarrow импортируется в функциях, которые им пользуются
+_HAS_PYARROW = find_spec("pyarrow") is not None
+
+# Названия колонок CSV для полей Product (по приоритету)
+COLUMN_ALIASES = {
+    'nm_id': ('nm_id', 'nmId'),
+    'product_name': ('product_name', 'sa_name'),
+    'deliveries': ('deliveries', 'Доставки'),
+    'sales': ('sales', 'Продажи'),
+    'returns': ('returns', 'Возвраты'),
+    'refusals': ('refusals', 'Отказы'),
+    'sales_amount_before_spp': ('sales_before_spp',),
+    'sales_amount_after_spp': ('sales_after_spp',),
+    'returns_amount': ('returns_amount',),
+    'logistics_cost': ('logistics',),
+    'storage_cost': ('storage',),
+    'acceptance_cost': ('acceptance',),
+    'penalty_cost': ('penalty',),
+    'surcharges': ('surcharges',),
+    'commission_with_spp': ('commission_with_spp',),
+    'commission_without_spp': ('commission_without_spp',),
+    'drr_cost': ('drr',),
+}
+
+# Общий ручной ввод по умолчанию для товаров из CSV (не изменять;
+# для изменяемых данных передавайте свой ManualInputData)
+_EMPTY_MANUAL = ManualInputData()
+
+# Размер блока CSV для параллельного разбора pyarrow (байт)
+CSV_BLOCK_SIZE = 4 << 20
+
+def _to_int(value: Any) -> int:
+    """Целое из значения CSV; пустая ячейка -> 0 (как в _numeric_column)."""
+    return int(float(value)) if value not in ('', None) else 0
+
+def _to_float(value: Any) -> float:
+    """Число из значения CSV; пустая ячейка -> 0.0 (как в _numeric_column)."""
+    return float(value) if value not in ('', None) else 0.0
+
+def _to_str(value: Any) -> str:
+    """Строка из значения CSV; пустая ячейка -> ''."""
+    return str(value) if value is not None else ''
+
+# Приведение значения CSV к типу поля Product
+FIELD_CASTERS = {name: _to_int for name in BATCH_INT_FIELDS}
+FIELD_CASTERS.update({name: _to_float for name in BATCH_FLOAT_FIELDS})
+FIELD_CASTERS['product_name'] = _to_str
+
+def _resolve_header(fieldnames: Iterable[str]) -> List[Tuple[str, str, Callable]]:
+    """
+    Сопоставить колонки CSV с полями Product по COLUMN_ALIASES.
+    
+    Args:
+        fieldnames: Названия колонок (заголовок CSV)
+        
+    Returns:
+        Список (поле, колонка, приведение типа) для найденных полей
+    """
+    names = set(fieldnames)
+    resolver = []
+    for field_name, aliases in COLUMN_ALIASES.items():
+        source = next((alias for alias in aliases if alias in names), None)
+        if source is not None:
+            resolver.append((field_name, source, FIELD_CASTERS[field_name]))
+    return resolver
+
+@lru_cache(maxsize=2)
+def _load_json_cached(path: str, mtime_ns: int, size: int) -> Tuple[Any, ...]:
+    """
+    Разобрать JSON файл в кортеж записей.
+    
+    mtime и размер в ключе сбрасывают кэш при изменении файла. Выгрузки
+    бывают большими, поэтому в памяти держатся только последние два файла.
+    """
+    with open(path, 'rb') as f:
+        raw = f.read()
+    data = orjson.loads(raw) if orjson is not None else json.loads(raw)
+    # Если данные не в виде списка, оборачиваем
+    return (data,) if isinstance(data, dict) else tuple(data)
+
+def _arrow_column_types() -> Dict[str, Any]:
+    """Типы колонок для pyarrow: названия - строки, остальные поля - float64."""
+    import pyarrow as pa
+    
+    types = {}
+    for field_name, aliases in COLUMN_ALIASES.items():
+        column_type = pa.string() if field_name == 'product_name' else pa.float64()
+        types.update(dict.fromkeys(aliases, column_type))
+    return types
+
+def _column_values(column: Any) -> Any:
+    """Значения колонки; колонки pyarrow переводятся в NumPy с заменой пропусков."""
+    # Колонка pyarrow бывает, только если он уже импортирован
+    pa = sys.modules.get('pyarrow')
+    if pa is not None and isinstance(column, pa.ChunkedArray):
+        fill = '' if pa.types.is_string(column.type) else 0
+        return column.fill_null(fill).to_numpy(zero_copy_only=False)
+    return column
+
+def _numeric_column(values: Any) -> np.ndarray:
+    """Колонка значений в float64; пустые и пропущенные значения -> 0."""
+    try:
+        array = np.asarray(values, dtype=np.float64)
+    except ValueError:
+        # Пустые строки (csv) разбираем поштучно
+        array = np.array([float(v) if v not in ('', None) else 0.0 for v in values], dtype=np.float64)
+    return np.nan_to_num(array, nan=0.0)
 
 class DataLoader:
     """Загрузчик данных из разных источников."""
@@ -18,11 +141,167 @@ class DataLoader:
             file_path: Путь к CSV файлу
             
         Returns:
-            Список словарей с данными
+            Список словарей с данными (значения - строки)
+        """
+        try:
+            with open(file_path, newline='', encoding='utf-8-sig') as f:
+                return list(csv.DictReader(f))
+        except FileNotFoundError:
+            raise
+        except Exception as e:
+            raise Exception(f"Ошибка чтения CSV: {e}")
+    
+    @staticmethod
+    def iter_from_csv(file_path: str) -> Iterator[Dict]:
+        """
+        Построчно читать CSV файл без загрузки его целиком.
+        
+        Args:
+            file_path: Путь к CSV файлу
+            
+        Returns:
+            Итератор словарей с данными (значения - строки)
+        """
+        with open(file_path, newline='', encoding='utf-8-sig') as f:
+            yield from csv.DictReader(f)
+    
+    @classmethod
+    def iter_products(cls, file_path: str, manual_data: Optional[ManualInputData] = None) -> Iterator[Product]:
+        """
+        Потоково преобразовать CSV файл WB в объекты Product.
+        
+        Каждая строка сразу превращается в Product и больше не хранится,
+        поэтому память не зависит от размера файла. Заголовок сопоставляется
+        с полями один раз, строки читаются csv.reader как списки и разбираются
+        по номерам колонок, без словаря на каждую строку.
+        
+        Args:
+            file_path: Путь к CSV файлу
+            manual_data: Ручной ввод данных (общий для всех товаров)
+            
+        Returns:
+            Итератор товаров
+        """
+        with open(file_path, newline='', encoding='utf-8-sig') as f:
+            reader = csv.reader(f)
+            header = next(reader, None)
+            if header is None:
+                return
+            # При повторе названия берём последнюю колонку, как csv.DictReader
+            positions = {name: index for index, name in enumerate(header)}
+            resolver = [(field_name, positions[source], cast) for field_name, source, cast in _resolve_header(header)]
+            
+            if manual_data is None:
+                manual_data = _EMPTY_MANUAL
+            build = cls._build_product
+            width = len(header)
+            for row in reader:
+                if row:
+                    if len(row) < width:
+                        # Недостающие ячейки - None, как restval у csv.DictReader
+                        row += [None] * (width - len(row))
+                    yield build(row, resolver, manual_data)
+    
+    @classmethod
+    def load_csv_batch(cls, file_path: str, manual_data: Optional[ManualInputData] = None) -> ProductBatch:
+        """
+        Загрузить CSV файл WB сразу в колоночную пачку ProductBatch.
+        
+        Если установлен pyarrow, файл отображается в память и разбирается
+        pyarrow.csv блоками по CSV_BLOCK_SIZE в нескольких потоках (колонки
+        сразу типизированы), иначе - через csv.DictReader.
+        
+        Args:
+            file_path: Путь к CSV файлу
+            manual_data: Ручной ввод данных (общий для пачки)
+            
+        Returns:
+            Пачка товаров
         """
+        if not _HAS_PYARROW:
+            rows = cls.load_from_csv(file_path)
+            columns = {name: [row[name] for row in rows] for name in (rows[0] if rows else ())}
+            return cls.parse_wb_csv_batch(columns, manual_data)
+        
+        return cls.parse_wb_csv_batch(cls._read_csv_table(file_path), manual_data)
+    
+    @classmethod
+    def load_cached(cls, file_path: str, manual_data: Optional[ManualInputData] = None) -> ProductBatch:
+        """
+        Загрузить CSV файл WB в ProductBatch через Parquet-кэш рядом с файлом.
+        
+        При первой загрузке CSV разбирается и сохраняется в <имя>.parquet (zstd)
+        с тем же mtime, что у CSV. Пока mtime совпадают, повторные загрузки читают
+        Parquet - колонки уже типизированы, разбирать текст не нужно. Испорченный
+        кэш пересобирается из CSV. Без pyarrow - как load_csv_batch.
+        
+        Args:
+            file_path: Путь к CSV файлу
+            manual_data: Ручной ввод данных (общий для пачки)
+            
+        Returns:
+            Пачка товаров
+        """
+        try:
+            import pyarrow as pa
+            import pyarrow.parquet as pa_parquet
+        except ImportError:  # без parquet load_cached читает CSV каждый раз
+            return cls.load_csv_batch(file_path, manual_data)
+        
+        csv_path = Path(file_path)
+        cache_path = csv_path.with_suffix('.parquet')
+        csv_mtime = csv_path.stat().st_mtime_ns
+        
+        try:
+            if cache_path.stat().st_mtime_ns == csv_mtime:
+                return cls.parse_wb_csv_batch(pa_parquet.read_table(cache_path), manual_data)
+        except (OSError, pa.ArrowInvalid):
+            # Кэша нет или он испорчен - пересобираем из CSV
+            pass
+        
+        table = cls._read_csv_table(csv_path)
+        cls._write_parquet_cache(table, cache_path, csv_mtime)
+        return cls.parse_wb_csv_batch(table, manual_data)
+    
+    @staticmethod
+    def _write_parquet_cache(table: Any, cache_path: Path, mtime_ns: int) -> None:
+        """
+        Атомарно записать Parquet-кэш: во временный файл рядом, затем os.replace.
+        
+        Прерванная запись не оставляет недописанный кэш. mtime кэша ставится
+        равным mtime CSV, по которому он собран.
+        """
+        import pyarrow.parquet as pa_parquet
+        
+        tmp_name = None
+        try:
+            fd, tmp_name = tempfile.mkstemp(dir=cache_path.parent, prefix=cache_path.name, suffix='.tmp')
+            os.close(fd)
+            pa_parquet.write_table(table, tmp_name, compression='zstd')
+            os.utime(tmp_name, ns=(mtime_ns, mtime_ns))
+            os.replace(tmp_name, cache_path)
+        except OSError:
+            # Кэш необязателен: например, каталог только для чтения
+            if tmp_name is not None:
+                Path(tmp_name).unlink(missing_ok=True)
+    
+    @staticmethod
+    def _read_csv_table(file_path: Any) -> Any:
+        """Прочитать CSV файл WB в pyarrow.Table с типизированными колонками полей."""
+        import pyarrow as pa
+        import pyarrow.csv as pa_csv
+        
         try:
-            df = pd.read_csv(file_path, encoding='utf-8')
-            return df.to_dict('records')
+            # Файл отображается в память без копирования; pyarrow сам режет его
+            # на блоки по границам строк и разбирает их в нескольких потоках
+            with pa.memory_map(str(file_path)) as source:
+                return pa_csv.read_csv(
+                    source,
+                    read_options=pa_csv.ReadOptions(use_threads=True, block_size=CSV_BLOCK_SIZE),
+                    convert_options=pa_csv.ConvertOptions(column_types=_arrow_column_types()),
+                )
+        except FileNotFoundError:
+            raise
         except Exception as e:
             raise Exception(f"Ошибка чтения CSV: {e}")
     
@@ -31,6 +310,10 @@ class DataLoader:
         """
         Загрузить данные из JSON файла.
         
+        Разобранные данные кэшируются, пока файл не изменится. Каждый вызов
+        получает свой список и свои копии словарей записей, так что их можно
+        изменять, не портя кэш.
+        
         Args:
             file_path: Путь к JSON файлу
             
@@ -38,12 +321,11 @@ class DataLoader:
             Список словарей с данными
         """
         try:
-            with open(file_path, 'r', encoding='utf-8') as f:
-                data = json.load(f)
-                # Если данные не в виде списка, оборачиваем
-                if isinstance(data, dict):
-                    return [data]
-                return data
+            stat = Path(file_path).stat()
+            data = _load_json_cached(str(file_path), stat.st_mtime_ns, stat.st_size)
+            return [dict(row) if isinstance(row, dict) else row for row in data]
+        except FileNotFoundError:
+            raise
         except Exception as e:
             raise Exception(f"Ошибка чтения JSON: {e}")
     
@@ -59,25 +341,76 @@ class DataLoader:
         Returns:
             Объект Product
         """
-        # Примерные названия колонок из WB отчёта
-        # Нужно адаптировать под реальные названия
-        return Product(
-            nm_id=int(row.get('nm_id', row.get('nmId', 0))),
-            product_name=row.get('product_name', row.get('sa_name', '')),
-            deliveries=int(row.get('deliveries', row.get('Доставки', 0))),
-            sales=int(row.get('sales', row.get('Продажи', 0))),
-            returns=int(row.get('returns', row.get('Возвраты', 0))),
-            refusals=int(row.get('refusals', row.get('Отказы', 0))),
-            sales_amount_before_spp=float(row.get('sales_before_spp', 0)),
-            sales_amount_after_spp=float(row.get('sales_after_spp', 0)),
-            returns_amount=float(row.get('returns_amount', 0)),
-            logistics_cost=float(row.get('logistics', 0)),
-            storage_cost=float(row.get('storage', 0)),
-            acceptance_cost=float(row.get('acceptance', 0)),
-            penalty_cost=float(row.get('penalty', 0)),
-            surcharges=float(row.get('surcharges', 0)),
-            commission_with_spp=float(row.get('commission_with_spp', 0)),
-            commission_without_spp=float(row.get('commission_without_spp', 0)),
-            drr_cost=float(row.get('drr', 0)),
-            manual_data=manual_data or ManualInputData()
-        )
\ No newline at end of file
+        if manual_data is None:
+            manual_data = _EMPTY_MANUAL
+        return DataLoader._build_product(row, _resolve_header(row), manual_data)
+    
+    @staticmethod
+    def parse_wb_csv_rows(rows: Iterable[Dict], manual_data: Optional[ManualInputData] = None) -> Iterator[Product]:
+        """
+        Преобразовать строки WB CSV в объекты Product.
+        
+        Колонки сопоставляются с полями один раз, по первой строке;
+        все строки должны иметь одинаковый набор колонок (как у csv.DictReader).
+        
+        Args:
+            rows: Строки из CSV
+            manual_data: Ручной ввод данных (общий для всех товаров)
+            
+        Returns:
+            Итератор товаров
+        """
+        if manual_data is None:
+            manual_data = _EMPTY_MANUAL
+        build = DataLoader._build_product
+        resolver = None
+        for row in rows:
+            if resolver is None:
+                resolver = _resolve_header(row)
+            yield build(row, resolver, manual_data)
+    
+    @staticmethod
+    def _build_product(row: Any, resolver: List[Tuple[str, Any, Callable]], manual_data: ManualInputData) -> Product:
+        """Собрать Product из строки (словаря или списка) по готовому сопоставлению колонок."""
+        values = {'nm_id': 0}
+        for field_name, source, cast in resolver:
+            values[field_name] = cast(row[source])
+        return Product(manual_data=manual_data, **values)
+    
+    @staticmethod
+    def parse_wb_csv_batch(columns: Any, manual_data: Optional[ManualInputData] = None) -> ProductBatch:
+        """
+        Преобразовать колонки WB CSV в пачку товаров ProductBatch.
+        
+        Названия колонок сопоставляются с полями один раз (COLUMN_ALIASES),
+        дальше каждая колонка приводится к массиву целиком, без цикла по строкам.
+        
+        Args:
+            columns: pandas.DataFrame, pyarrow.Table или словарь {колонка: значения}
+            manual_data: Ручной ввод данных (общий для пачки)
+            
+        Returns:
+            Пачка товаров
+        """
+        pa = sys.modules.get('pyarrow')
+        names = columns.column_names if pa is not None and isinstance(columns, pa.Table) else columns
+        sources = {
+            field_name: _column_values(columns[source])
+            for field_name, source, _ in _resolve_header(names)
+        }
+        
+        n = len(next(iter(sources.values()))) if sources else 0
+        arrays = {}
+        for name in BATCH_INT_FIELDS:
+            arrays[name] = (_numeric_column(sources[name]).astype(np.int64)
+                            if name in sources else np.zeros(n, dtype=np.int64))
+        for name in BATCH_FLOAT_FIELDS:
+            arrays[name] = _numeric_column(sources[name]) if name in sources else np.zeros(n, dtype=np.float64)
+        if 'product_name' in sources:
+            arrays['product_name'] = np.asarray(sources['product_name'], dtype=object)
+        else:
+            arrays['product_name'] = np.full(n, '', dtype=object)
+        
+        if manual_data is None:
+            manual_data = _EMPTY_MANUAL
+        return ProductBatch(manual_data=manual_data, **arrays)
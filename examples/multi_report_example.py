@@ -1,13 +1,10 @@
 """Пример использования MultiReportLoader для массовой загрузки отчётов WB."""
-import os
 from pathlib import Path
 from datetime import datetime, timedelta
-from dotenv import load_dotenv
 
 from api.multi_report_loader import MultiReportLoader
-
-# Загружаем переменные окружения
-load_dotenv()
+from api.wb_client import format_rfc3339
+from config import get_config
 
 def main():
     """
@@ -18,7 +15,7 @@ def main():
     print("="*70 + "\n")
     
     # Получаем API ключ
-    api_key = os.getenv("WB_API_KEY")
+    api_key = get_config().WB_API_KEY
     if not api_key:
         print("❌ Ошибка: WB_API_KEY не найден в .env файле")
         return
@@ -30,8 +27,8 @@ def main():
     date_to = datetime.now()
     date_from = date_to - timedelta(days=7)
     
-    date_from_str = date_from.strftime("%Y-%m-%dT00:00:00Z")
-    date_to_str = date_to.strftime("%Y-%m-%dT23:59:59Z")
+    date_from_str = format_rfc3339(date_from)
+    date_to_str = format_rfc3339(date_to, end_of_day=True)
     
     print(f"📅 Период: {date_from_str} → {date_to_str}\n")
     
@@ -55,6 +52,7 @@ def main():
         date_from=date_from_str,
         date_to=date_to_str
     )
+    loader.close()
     
     # Выводим сводку
     loader.print_summary(results)
@@ -81,7 +79,7 @@ def example_custom_reports():
     print("📦 ПРИМЕР 2: Загрузка только финансовых отчётов")
     print("="*70 + "\n")
     
-    api_key = os.getenv("WB_API_KEY")
+    api_key = get_config().WB_API_KEY
     if not api_key:
         print("❌ WB_API_KEY не найден")
         return
@@ -101,6 +99,7 @@ def example_custom_reports():
         date_from="2025-10-01T00:00:00Z",
         date_to="2025-10-31T23:59:59Z"
     )
+    loader.close()
     
     loader.print_summary(results)
     
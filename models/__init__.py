@@ -1,4 +1,4 @@
 """Data models module."""
-from .product import Product, ManualInputData, ProductMetrics
+from .product import Product, ManualInputData, ProductMetrics, ProductBatch, ProductFrame
 
-__all__ = ['Product', 'ManualInputData', 'ProductMetrics']
\ No newline at end of file
+__all__ = ['Product', 'ManualInputData', 'ProductMetrics', 'ProductBatch', 'ProductFrame']
\ No newline at end of file
@@ -1,8 +1,10 @@
 """Product data models."""
 from dataclasses import dataclass, field
-from typing import Optional
+from typing import Dict, Iterator, Optional
 
-@dataclass
+import numpy as np
+
+@dataclass(slots=True)
 class ManualInputData:
     """Данные для ручного ввода."""
     cost_per_unit: float = 0.0  # Себестоимость на единицу
@@ -12,7 +14,7 @@ class ManualInputData:
     giveaway_cost: float = 0.0  # Себестоимость раздач
     marketing_cost: float = 0.0  # Дополнительные маркетинговые расходы
 
-@dataclass
+@dataclass(slots=True)
 class Product:
     """Модель товара с данными WB."""
     # Идентификация
@@ -62,7 +64,14 @@ class Product:
             return 0.0
         return (self.returns / self.sales) * 100
 
-@dataclass
+# Колонки отчёта в порядке ProductMetrics.to_dict
+REPORT_FIELDS = (
+    'nm_id', 'product_name', 'sales', 'returns', 'net_sales', 'revenue',
+    'cogs', 'gross_profit', 'total_expenses', 'net_profit',
+    'profit_margin_percent', 'roi_percent', 'avg_check',
+)
+
+@dataclass(slots=True)
 class ProductMetrics:
     """Рассчитанные метрики товара."""
     product: Product
@@ -76,20 +85,193 @@ class ProductMetrics:
     roi_percent: float = 0.0  # ROI (%)
     avg_check: float = 0.0  # Средний чек
     
+    def to_row(self) -> tuple:
+        """Значения отчёта кортежем, в порядке REPORT_FIELDS."""
+        product = self.product
+        return (
+            product.nm_id,
+            product.product_name,
+            product.sales,
+            product.returns,
+            product.net_sales,
+            product.sales_amount_after_spp,
+            self.cogs,
+            self.gross_profit,
+            self.total_expenses,
+            self.net_profit,
+            round(self.profit_margin_percent, 2),
+            round(self.roi_percent, 2),
+            round(self.avg_check, 2)
+        )
+    
     def to_dict(self) -> dict:
         """Конвертировать в словарь."""
+        return dict(zip(REPORT_FIELDS, self.to_row()))
+
+# Числовые поля Product в колоночной пачке ProductBatch
+BATCH_INT_FIELDS = ('nm_id', 'deliveries', 'sales', 'returns', 'refusals')
+BATCH_FLOAT_FIELDS = (
+    'sales_amount_before_spp', 'sales_amount_after_spp', 'returns_amount',
+    'logistics_cost', 'storage_cost', 'acceptance_cost', 'penalty_cost', 'surcharges',
+    'commission_with_spp', 'commission_without_spp', 'drr_cost',
+)
+
+def _percent(part: np.ndarray, whole: np.ndarray) -> np.ndarray:
+    """Доля part от whole в процентах без деления там, где whole == 0."""
+    ratio = np.divide(part, whole, out=np.zeros(len(part), dtype=np.float64), where=whole != 0)
+    return ratio * 100
+
+def _round_cents(values: np.ndarray) -> np.ndarray:
+    """
+    Округлить до 2 знаков так же, как round(v, 2) в ProductMetrics.to_row.
+    
+    np.round умножает на 100 и может получить ложную половину (2.675 -> 267.5
+    -> 2.68, а round() даёт 2.67). Расходятся они только на таких половинах:
+    их пересчитывает round(), остальное округляется векторно.
+    """
+    scaled = values * 100
+    rounded = np.rint(scaled) / 100
+    ties = np.flatnonzero(np.abs(np.modf(scaled)[0]) == 0.5)
+    rounded[ties] = [round(v, 2) for v in values[ties].tolist()]
+    return rounded
+
+@dataclass(slots=True, eq=False)
+class ProductBatch:
+    """
+    Пачка товаров в колоночном виде (struct-of-arrays).
+    
+    Каждое поле Product хранится отдельным массивом NumPy одной длины:
+    целочисленные поля - int64, денежные - float64, названия - object.
+    Ручной ввод общий для всей пачки. Объекты Product создаются
+    только по запросу: batch[i] или итерация.
+    """
+    nm_id: np.ndarray
+    product_name: np.ndarray
+    
+    # Объёмы (шт)
+    deliveries: np.ndarray
+    sales: np.ndarray
+    returns: np.ndarray
+    refusals: np.ndarray
+    
+    # Финансы (руб)
+    sales_amount_before_spp: np.ndarray
+    sales_amount_after_spp: np.ndarray
+    returns_amount: np.ndarray
+    
+    # Расходы WB (руб)
+    logistics_cost: np.ndarray
+    storage_cost: np.ndarray
+    acceptance_cost: np.ndarray
+    penalty_cost: np.ndarray
+    surcharges: np.ndarray
+    commission_with_spp: np.ndarray
+    commission_without_spp: np.ndarray
+    drr_cost: np.ndarray
+    
+    # Ручной ввод
+    manual_data: ManualInputData = field(default_factory=ManualInputData)
+    
+    def __len__(self) -> int:
+        return len(self.nm_id)
+    
+    def __getitem__(self, index: int) -> Product:
+        """Собрать Product для одной строки пачки."""
+        values = {name: int(getattr(self, name)[index]) for name in BATCH_INT_FIELDS}
+        for name in BATCH_FLOAT_FIELDS:
+            values[name] = float(getattr(self, name)[index])
+        return Product(product_name=str(self.product_name[index]), manual_data=self.manual_data, **values)
+    
+    def __iter__(self) -> Iterator[Product]:
+        for index in range(len(self)):
+            yield self[index]
+    
+    @property
+    def net_sales(self) -> np.ndarray:
+        """Чистые продажи (шт) по всем товарам пачки."""
+        return self.sales - self.returns - self.manual_data.self_purchase_count
+    
+    @property
+    def percent_refusals(self) -> np.ndarray:
+        """Процент отказов; для товаров без доставок - 0."""
+        return _percent(self.refusals, self.deliveries)
+    
+    @property
+    def percent_returns(self) -> np.ndarray:
+        """Процент возвратов; для товаров без продаж - 0."""
+        return _percent(self.returns, self.sales)
+    
+    def to_columns(self) -> Dict[str, np.ndarray]:
+        """
+        Колонки для Calculator.calculate_metrics_from_columns.
+        
+        Поля ручного ввода разворачиваются в массивы длины пачки.
+        """
+        n = len(self)
+        columns = {name: getattr(self, name) for name in BATCH_INT_FIELDS + BATCH_FLOAT_FIELDS}
+        manual = self.manual_data
+        for name in ('cost_per_unit', 'self_purchase_count', 'giveaway_count', 'giveaway_cost', 'marketing_cost'):
+            columns[name] = np.full(n, getattr(manual, name), dtype=np.float64)
+        return columns
+
+@dataclass(slots=True, eq=False)
+class ProductFrame:
+    """
+    Пачка товаров с рассчитанными метриками в колоночном виде.
+    
+    Колоночный аналог списка ProductMetrics: каждая метрика - массив float64
+    в порядке товаров products. Итоги и сортировки считаются над массивами,
+    объекты ProductMetrics создаются только по запросу (frame[i]).
+    """
+    products: ProductBatch
+    cogs: np.ndarray
+    gross_profit: np.ndarray
+    total_expenses: np.ndarray
+    net_profit: np.ndarray
+    profit_margin_percent: np.ndarray
+    roi_percent: np.ndarray
+    avg_check: np.ndarray
+    
+    def __len__(self) -> int:
+        return len(self.products)
+    
+    def __getitem__(self, index: int) -> ProductMetrics:
+        """Собрать ProductMetrics для одного товара."""
+        return ProductMetrics(
+            product=self.products[index],
+            cogs=float(self.cogs[index]),
+            gross_profit=float(self.gross_profit[index]),
+            total_expenses=float(self.total_expenses[index]),
+            net_profit=float(self.net_profit[index]),
+            profit_margin_percent=float(self.profit_margin_percent[index]),
+            roi_percent=float(self.roi_percent[index]),
+            avg_check=float(self.avg_check[index])
+        )
+    
+    def __iter__(self) -> Iterator[ProductMetrics]:
+        for index in range(len(self)):
+            yield self[index]
+    
+    @property
+    def revenue(self) -> np.ndarray:
+        """Выручка после СПП."""
+        return self.products.sales_amount_after_spp
+    
+    def to_columns(self) -> Dict[str, np.ndarray]:
+        """Колонки отчёта: те же поля и округление, что в ProductMetrics.to_dict."""
+        products = self.products
         return {
-            'nm_id': self.product.nm_id,
-            'product_name': self.product.product_name,
-            'sales': self.product.sales,
-            'returns': self.product.returns,
-            'net_sales': self.product.net_sales,
-            'revenue': self.product.sales_amount_after_spp,
+            'nm_id': products.nm_id,
+            'product_name': products.product_name,
+            'sales': products.sales,
+            'returns': products.returns,
+            'net_sales': products.net_sales,
+            'revenue': self.revenue,
             'cogs': self.cogs,
             'gross_profit': self.gross_profit,
             'total_expenses': self.total_expenses,
             'net_profit': self.net_profit,
-            'profit_margin_percent': round(self.profit_margin_percent, 2),
-            'roi_percent': round(self.roi_percent, 2),
-            'avg_check': round(self.avg_check, 2)
-        }
\ No newline at end of file
+            'profit_margin_percent': _round_cents(self.profit_margin_percent),
+            'roi_percent': _round_cents(self.roi_percent),
+            'avg_check': _round_cents(self.avg_check)
+        }
@@ -1,94 +1,160 @@
 """Export results to files."""
 import json
 import csv
-from typing import List, Dict
+import heapq
+from importlib.util import find_spec
+from typing import List, Dict, Union
+from operator import attrgetter
 from pathlib import Path
-from models.product import ProductMetrics
+
+import numpy as np
+
+from models.product import REPORT_FIELDS, ProductFrame, ProductMetrics
+
+try:
+    import orjson
+except ImportError:  # orjson опционален: без него используется стандартный json
+    orjson = None
+
+# pyarrow опционален: без него CSV пишется модулем csv. Импорт тяжёлый,
+# поэтому pyarrow импортируется только в export_to_csv_arrow
+_HAS_PYARROW = find_spec("pyarrow") is not None
 
 class Exporter:
     """Экспортер результатов."""
     
     @staticmethod
-    def export_to_json(metrics: List[ProductMetrics], output_path: Path) -> None:
+    def export_to_json(metrics: Union[List[ProductMetrics], ProductFrame], output_path: Path) -> None:
         """
         Экспортировать результаты в JSON.
         
         Args:
-            metrics: Список метрик
+            metrics: Список метрик или ProductFrame
             output_path: Путь к выходному файлу
         """
-        data = [m.to_dict() for m in metrics]
+        if isinstance(metrics, ProductFrame):
+            # Строки собираем из колонок, минуя объекты ProductMetrics
+            columns = metrics.to_columns()
+            keys = list(columns)
+            data = [dict(zip(keys, row)) for row in zip(*(c.tolist() for c in columns.values()))]
+        else:
+            # map по списку заранее знает длину результата
+            data = list(map(ProductMetrics.to_dict, metrics))
         
         output_path.parent.mkdir(parents=True, exist_ok=True)
         
-        with open(output_path, 'w', encoding='utf-8') as f:
-            json.dump(data, f, ensure_ascii=False, indent=2)
+        if orjson is not None:
+            # Один вызов dumps пишет байты сразу, без промежуточной str
+            options = orjson.OPT_INDENT_2 | orjson.OPT_NON_STR_KEYS | orjson.OPT_SERIALIZE_NUMPY
+            with open(output_path, 'wb') as f:
+                f.write(orjson.dumps(data, option=options))
+        else:
+            with open(output_path, 'w', encoding='utf-8') as f:
+                json.dump(data, f, ensure_ascii=False, indent=2)
         
         print(f"\u2705 Результаты экспортированы в: {output_path}")
     
     @staticmethod
-    def export_to_csv(metrics: List[ProductMetrics], output_path: Path) -> None:
+    def export_to_csv(metrics: Union[List[ProductMetrics], ProductFrame], output_path: Path) -> None:
         """
         Экспортировать результаты в CSV.
         
         Args:
-            metrics: Список метрик
+            metrics: Список метрик или ProductFrame
             output_path: Путь к выходному файлу
         """
         if not metrics:
             print("⚠️  Нет данных для экспорта")
             return
         
-        output_path.parent.mkdir(parents=True, exist_ok=True)
+        if _HAS_PYARROW and isinstance(metrics, ProductFrame):
+            Exporter.export_to_csv_arrow(metrics, output_path)
+            return
         
-        data = [m.to_dict() for m in metrics]
-        fieldnames = data[0].keys()
+        output_path.parent.mkdir(parents=True, exist_ok=True)
         
+        # Строки пишутся кортежами, без словаря на каждую строку
         with open(output_path, 'w', encoding='utf-8', newline='') as f:
-            writer = csv.DictWriter(f, fieldnames=fieldnames)
-            writer.writeheader()
-            writer.writerows(data)
+            writer = csv.writer(f)
+            writer.writerow(REPORT_FIELDS)
+            writer.writerows(map(ProductMetrics.to_row, metrics))
         
         print(f"\u2705 Результаты экспортированы в: {output_path}")
     
     @staticmethod
-    def print_summary(metrics: List[ProductMetrics]) -> None:
+    def export_to_csv_arrow(frame: ProductFrame, output_path: Path) -> None:
         """
-        Вывести сводку по товарам.
+        Экспортировать ProductFrame в CSV через pyarrow, без построчных словарей.
         
         Args:
-            metrics: Список метрик
+            frame: Метрики в колоночном виде
+            output_path: Путь к выходному файлу
         """
-        if not metrics:
-            print("⚠️  Нет данных для отображения")
-            return
-        
-        print("\n" + "="*80)
-        print("📊 СВОДКА ПО ТОВАРАМ")
-        print("="*80)
+        import pyarrow as pa
+        import pyarrow.csv as pa_csv
         
-        total_revenue = sum(m.product.sales_amount_after_spp for m in metrics)
-        total_cogs = sum(m.cogs for m in metrics)
-        total_gross_profit = sum(m.gross_profit for m in metrics)
-        total_net_profit = sum(m.net_profit for m in metrics)
-        
-        print(f"\n💰 ОБЩИЕ ПОКАЗАТЕЛИ:")
-        print(f"   Выручка: {total_revenue:,.2f} руб")
-        print(f"   COGS: {total_cogs:,.2f} руб")
-        print(f"   Валовая прибыль: {total_gross_profit:,.2f} руб")
-        print(f"   Чистая прибыль: {total_net_profit:,.2f} руб")
+        output_path.parent.mkdir(parents=True, exist_ok=True)
         
-        # Сортируем по чистой прибыли
-        sorted_metrics = sorted(metrics, key=lambda m: m.net_profit, reverse=True)
+        pa_csv.write_csv(pa.table(frame.to_columns()), str(output_path))
         
-        print(f"\n🏆 ТОП-3 ПРИБЫЛЬНЫХ:")
-        for i, m in enumerate(sorted_metrics[:3], 1):
-            print(f"   {i}. {m.product.product_name or f'nm_id {m.product.nm_id}'}")
-            print(f"      Прибыль: {m.net_profit:,.2f} руб | Маржа: {m.profit_margin_percent:.1f}% | ROI: {m.roi_percent:.1f}%")
+        print(f"\u2705 Результаты экспортированы в: {output_path}")
+    
+    @staticmethod
+    def print_summary(metrics: Union[List[ProductMetrics], ProductFrame]) -> None:
+        """
+        Вывести сводку по товарам.
         
-        print(f"\n📉 ТОП-3 УБЫТОЧНЫХ:")
-        for i, m in enumerate(sorted_metrics[-3:][::-1], 1):
-            print(f"   {i}. {m.product.product_name or f'nm_id {m.product.nm_id}'}")
-            print(f"      Прибыль: {m.net_profit:,.2f} руб | Маржа: {m.profit_margin_percent:.1f}% | ROI: {m.roi_percent:.1f}%")
+        Args:
+            metrics: Список метрик или ProductFrame (итоги и сортировка - над массивами)
+        """
+        if not metrics:
+            print("⚠️  Нет данных для отображения")
+            return
         
-        print("\n" + "="*80)
\ No newline at end of file
+        if isinstance(metrics, ProductFrame):
+            total_revenue = float(metrics.revenue.sum())
+            total_cogs = float(metrics.cogs.sum())
+            total_gross_profit = float(metrics.gross_profit.sum())
+            total_net_profit = float(metrics.net_profit.sum())
+            # Отбираем по 3 крайних по чистой прибыли без полной сортировки;
+            # ProductMetrics собираем только для вывода
+            net_profit = metrics.net_profit
+            if len(net_profit) > 3:
+                top_idx = np.argpartition(net_profit, -3)[-3:]
+                bottom_idx = np.argpartition(net_profit, 3)[:3]
+            else:
+                top_idx = bottom_idx = np.arange(len(net_profit))
+            top = [metrics[i] for i in top_idx[np.argsort(-net_profit[top_idx], kind='stable')]]
+            bottom = [metrics[i] for i in bottom_idx[np.argsort(net_profit[bottom_idx], kind='stable')]]
+        else:
+            # Все итоги за один проход по списку
+            total_revenue = total_cogs = total_gross_profit = total_net_profit = 0.0
+            for m in metrics:
+                total_revenue += m.product.sales_amount_after_spp
+                total_cogs += m.cogs
+                total_gross_profit += m.gross_profit
+                total_net_profit += m.net_profit
+            # Отбираем по 3 крайних по чистой прибыли без полной сортировки
+            top = heapq.nlargest(3, metrics, key=attrgetter('net_profit'))
+            bottom = heapq.nsmallest(3, metrics, key=attrgetter('net_profit'))
+        
+        # Сводку собираем целиком и выводим одним print
+        lines = [
+            "\n" + "="*80,
+            "📊 СВОДКА ПО ТОВАРАМ",
+            "="*80,
+            f"\n💰 ОБЩИЕ ПОКАЗАТЕЛИ:",
+            f"   Выручка: {total_revenue:,.2f} руб",
+            f"   COGS: {total_cogs:,.2f} руб",
+            f"   Валовая прибыль: {total_gross_profit:,.2f} руб",
+            f"   Чистая прибыль: {total_net_profit:,.2f} руб",
+        ]
+        
+        for title, selected in (("\n🏆 ТОП-3 ПРИБЫЛЬНЫХ:", top), ("\n📉 ТОП-3 УБЫТОЧНЫХ:", bottom)):
+            lines.append(title)
+            for i, m in enumerate(selected, 1):
+                lines.append(f"   {i}. {m.product.product_name or f'nm_id {m.product.nm_id}'}")
+                lines.append(f"      Прибыль: {m.net_profit:,.2f} руб | Маржа: {m.profit_margin_percent:.1f}% | ROI: {m.roi_percent:.1f}%")
+        
+        lines.append("\n" + "="*80)
+        print("\n".join(lines))
\ No newline at end of file
@@ -4,16 +4,16 @@
 Загружает несколько отчётов параллельно и сохраняет в один JSON.
 """
 
-import os
 import sys
 from pathlib import Path
 from datetime import datetime, timedelta
-from dotenv import load_dotenv
 
 # Добавляем корневую директорию в PYTHONPATH
 sys.path.insert(0, str(Path(__file__).parent))
 
 from api.multi_report_loader import MultiReportLoader
+from api.wb_client import format_rfc3339
+from config import get_config
 
 def main():
     """Главная функция тестирования."""
@@ -21,10 +21,8 @@ def main():
     print("🧪 WB API MULTI-REPORT LOADER - БЫСТРЫЙ ТЕСТ")
     print("="*70 + "\n")
     
-    # Загружаем переменные окружения
-    load_dotenv()
-    
-    api_key = os.getenv("WB_API_KEY")
+    # Ключ берётся из общей конфигурации (.env читается в config)
+    api_key = get_config().WB_API_KEY
     if not api_key:
         print("❌ Ошибка: WB_API_KEY не найден в .env файле")
         print("💡 Создайте .env файл и добавьте:")
@@ -40,8 +38,8 @@ def main():
     date_to = datetime.now()
     date_from = date_to - timedelta(days=7)
     
-    date_from_str = date_from.strftime("%Y-%m-%dT00:00:00Z")
-    date_to_str = date_to.strftime("%Y-%m-%dT23:59:59Z")
+    date_from_str = format_rfc3339(date_from)
+    date_to_str = format_rfc3339(date_to, end_of_day=True)
     
     print(f"📅 Период: {date_from_str} → {date_to_str}\n")
     
@@ -71,6 +69,8 @@ def main():
         print("   2. Установлен aiohttp: pip install aiohttp")
         print("   3. Есть интернет-соединение\n")
         return
+    finally:
+        loader.close()
     
     # Выводим сводку
     loader.print_summary(results)
@@ -49,4 +49,79 @@ def test_calculate_roi():
     roi = calc.calculate_roi(net_profit=2000, cogs=6000)
     
     # (2000 / 6000) * 100 = 33.33%
-    assert abs(roi - 33.33) < 0.01
\ No newline at end of file
+    assert abs(roi - 33.33) < 0.01
+
+def test_calculate_all_metrics_batch_matches_scalar():
+    """Test batch metrics equal per-product metrics."""
+    products = [
+        Product(
+            nm_id=1,
+            sales=100,
+            returns=10,
+            sales_amount_after_spp=50000,
+            logistics_cost=3000,
+            surcharges=500,
+            manual_data=ManualInputData(cost_per_unit=200, giveaway_count=2, giveaway_cost=400)
+        ),
+        Product(nm_id=2),  # нулевые продажи и выручка
+    ]
+    
+    calc = Calculator()
+    batch = calc.calculate_all_metrics_batch(products)
+    
+    for i, product in enumerate(products):
+        expected = calc.calculate_all_metrics(product)
+        for name, values in batch.items():
+            assert values[i] == pytest.approx(getattr(expected, name))
+
+
+def test_batch_kernel_matches_numpy_fallback():
+    """Test compiled kernel (if numba is installed) agrees with pure NumPy."""
+    import numpy as np
+    from analyzer.calculator import _BATCH_COLUMNS, _compute_metrics, _compute_metrics_numpy
+    
+    rng = np.random.default_rng(0)
+    cols = {name: rng.integers(0, 50, size=64).astype(np.float64) for name in _BATCH_COLUMNS}
+    
+    expected = _compute_metrics_numpy(cols)
+    actual = _compute_metrics(cols)
+    
+    for name, values in expected.items():
+        np.testing.assert_allclose(actual[name], values)
+
+
+def test_calculate_metrics_from_columns_fills_missing_with_zeros():
+    """Test column-based metrics with only some columns provided."""
+    calc = Calculator()
+    metrics = calc.calculate_metrics_from_columns({
+        'sales': [10, 0],
+        'sales_amount_after_spp': [1000.0, 0.0],
+        'cost_per_unit': [50.0, 10.0],
+    })
+    
+    assert list(metrics['cogs']) == [500.0, 0.0]
+    assert list(metrics['roi_percent']) == [100.0, 0.0]
+    assert list(metrics['avg_check']) == [100.0, 0.0]
+
+
+def test_calculate_frame_matches_scalar():
+    """Test ProductFrame rows agree with per-product metrics."""
+    from models.product import ProductBatch
+    
+    products = [
+        Product(nm_id=1, sales=10, returns=1, sales_amount_after_spp=5000.0, logistics_cost=200.0),
+        Product(nm_id=2),
+    ]
+    batch = ProductBatch(**{
+        name: [getattr(p, name) for p in products]
+        for name in ProductBatch.__dataclass_fields__ if name != 'manual_data'
+    })
+    
+    calc = Calculator()
+    frame = calc.calculate_frame(batch)
+    
+    assert len(frame) == 2
+    for row, product in zip(frame, products):
+        expected = calc.calculate_all_metrics(product)
+        assert row.net_profit == pytest.approx(expected.net_profit)
+        assert row.roi_percent == pytest.approx(expected.roi_percent)
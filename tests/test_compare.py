@@ -0,0 +1,78 @@
+"""Tests for DataComparator (compare_api_vs_csv.py)."""
+import pytest
+
+from compare_api_vs_csv import CSV_COLUMNS, DataComparator
+
+def _write_report(path, header, rows):
+    """Записать CSV в формате отчёта WB: 8 строк комментариев, затем заголовок."""
+    lines = [f"# comment {i}" for i in range(8)]
+    lines.append(",".join(header))
+    lines.extend(",".join(row) for row in rows)
+    path.write_text("\n".join(lines) + "\n", encoding='utf-8')
+
+def _row(nm_id, article, name, quantity, to_pay, width=50):
+    row = ["0"] * width
+    row[2], row[3], row[5], row[9], row[48] = nm_id, article, name, quantity, to_pay
+    return row
+
+@pytest.mark.parametrize("use_pyarrow", [True, False])
+def test_load_csv_data_with_duplicate_headers(tmp_path, monkeypatch, use_pyarrow):
+    """Test columns are picked by position when header names repeat."""
+    import compare_api_vs_csv
+    if not use_pyarrow:
+        monkeypatch.setattr(compare_api_vs_csv, "pa_csv", None)
+    
+    header = [f"h{i}" for i in range(50)]
+    header[9] = header[10] = "Продажи"
+    header[2] = header[48] = "Артикул"
+    path = tmp_path / "report.csv"
+    _write_report(path, header, [_row("101", "a1", "Шапка", "2", "\"10,5\"")])
+    
+    df = DataComparator.__new__(DataComparator).load_csv_data(path)
+    
+    assert list(df.columns) == list(CSV_COLUMNS.values())
+    assert df.iloc[0].tolist() == ["101", "a1", "Шапка", "2", "10,5"]
+
+@pytest.mark.parametrize("use_pyarrow", [True, False])
+def test_load_csv_data_with_short_totals_row(tmp_path, monkeypatch, use_pyarrow):
+    """Test a short trailing totals row is read with empty cells instead of failing."""
+    import compare_api_vs_csv
+    if not use_pyarrow:
+        monkeypatch.setattr(compare_api_vs_csv, "pa_csv", None)
+    
+    path = tmp_path / "report.csv"
+    _write_report(path, [f"h{i}" for i in range(50)], [
+        _row("101", "a1", "Шапка", "2", "10"),
+        ["Итого", "", "", "2"],
+    ])
+    
+    df = DataComparator.__new__(DataComparator).load_csv_data(path)
+    
+    assert len(df) == 2
+    assert df.iloc[0].tolist() == ["101", "a1", "Шапка", "2", "10"]
+    assert df.iloc[1]["seller_article"] == "2"
+    assert df.iloc[1].drop("seller_article").isna().all()
+    
+    metrics = DataComparator.__new__(DataComparator).calculate_metrics_from_csv(df)
+    assert metrics["total_articles"] == 1
+
+def test_calculate_metrics_from_csv_sums_duplicate_nm_ids():
+    """Test rows with the same nm_id are summed, like the API aggregation."""
+    import pandas as pd
+    
+    df = pd.DataFrame({
+        "nm_id": ["101", "101", "202", "-1", ""],
+        "seller_article": ["a1", "a1-old", "b2", "x", ""],
+        "name": ["Шапка", "Шапка", "Шарф", "y", ""],
+        "quantity": ["2", "3", "1", "5", ""],
+        "to_pay": ["1 200,5 ₽", "10,5", "100", "1", ""],
+    })
+    
+    metrics = DataComparator.__new__(DataComparator).calculate_metrics_from_csv(df)
+    
+    assert metrics["total_articles"] == 2
+    assert metrics["by_article"]["101"] == {
+        "nm_id": "101", "seller_article": "a1", "name": "Шапка", "quantity": 5.0, "to_pay": 1211.0,
+    }
+    assert metrics["total_quantity"] == 6.0
+    assert metrics["total_to_pay"] == 1311.0
@@ -0,0 +1,21 @@
+"""Tests for Config."""
+import pytest
+
+from config import Config, get_config
+
+def test_class_level_access_reads_shared_config(monkeypatch):
+    """Test Config.<SETTING> and Config.validate() keep working without an instance."""
+    monkeypatch.setenv("WB_API_KEY", "")
+    get_config.cache_clear()
+    try:
+        assert Config.WB_API_KEY == "" == get_config().WB_API_KEY
+        with pytest.raises(ValueError):
+            Config.validate()
+        
+        monkeypatch.setenv("WB_API_KEY", "secret")
+        get_config.cache_clear()
+        assert Config.WB_API_KEY == "secret"
+        assert Config.validate() is True
+        assert get_config().validate() is True
+    finally:
+        get_config.cache_clear()
@@ -0,0 +1,39 @@
+"""Tests for Exporter."""
+import csv
+
+import numpy as np
+
+from models.product import Product, ProductMetrics, _round_cents
+from storage.export import Exporter
+
+def test_export_to_csv_matches_to_dict(tmp_path):
+    """Test CSV rows keep the values, types and rounding of to_dict."""
+    metrics = [
+        ProductMetrics(
+            product=Product(nm_id=1, product_name="Футболка", sales=3, sales_amount_after_spp=50000),
+            cogs=100.5,
+            net_profit=-20.25,
+            profit_margin_percent=12.345,
+            avg_check=2.675,  # round() даёт 2.67, np.round - 2.68
+        ),
+        ProductMetrics(product=Product(nm_id=2, sales=2.5, returns=1)),
+    ]
+    path = tmp_path / "report.csv"
+    
+    Exporter.export_to_csv(metrics, path)
+    
+    with open(path, encoding='utf-8', newline='') as f:
+        rows = list(csv.reader(f))
+    
+    assert rows[0] == list(metrics[0].to_dict())
+    for row, m in zip(rows[1:], metrics):
+        assert row == [str(value) for value in m.to_dict().values()]
+    assert rows[1][5] == "50000"
+    assert rows[1][-1] == "2.67"
+    assert rows[2][2] == "2.5"
+
+def test_frame_rounding_matches_round():
+    """Test ProductFrame columns round exactly like round(v, 2) in to_row."""
+    values = np.array([2.675, -2.675, 1.005, 0.125, 12.345, -0.004, 1 / 3, np.inf])
+    
+    assert _round_cents(values).tolist() == [round(v, 2) for v in values.tolist()]
@@ -0,0 +1,110 @@
+"""Tests for DataLoader."""
+import os
+
+import pytest
+
+from data.loader import DataLoader
+
+def test_blank_numeric_cells_parse_as_zero(tmp_path):
+    """Test row and batch parsers both read blank CSV cells as 0."""
+    path = tmp_path / "report.csv"
+    path.write_text(
+        "nmId,sa_name,Продажи,Возвраты,sales_after_spp,logistics\n"
+        "1,Футболка,5,,100.5,\n"
+        "2,,3,1,,7\n",
+        encoding='utf-8'
+    )
+    
+    rows = DataLoader.load_from_csv(str(path))
+    product = DataLoader.parse_wb_csv_to_product(rows[0])
+    assert product.returns == 0
+    assert product.logistics_cost == 0.0
+    
+    products = list(DataLoader.iter_products(str(path)))
+    batch = DataLoader.load_csv_batch(str(path))
+    assert [p.returns for p in products] == list(batch.returns) == [0, 1]
+    assert [p.sales_amount_after_spp for p in products] == list(batch.sales_amount_after_spp) == [100.5, 0.0]
+    assert products[1].product_name == ""
+
+def test_utf8_bom_header_is_recognised(tmp_path):
+    """Test a leading UTF-8 BOM (Excel/WB exports) does not hide the first column."""
+    path = tmp_path / "report.csv"
+    path.write_text("nmId,sa_name,Продажи\n11,Футболка,5\n", encoding='utf-8-sig')
+    
+    assert DataLoader.load_from_csv(str(path))[0]["nmId"] == "11"
+    assert next(DataLoader.iter_from_csv(str(path)))["nmId"] == "11"
+    assert DataLoader.parse_wb_csv_to_product(DataLoader.load_from_csv(str(path))[0]).nm_id == 11
+    assert [p.nm_id for p in DataLoader.iter_products(str(path))] == [11]
+    assert list(DataLoader.load_csv_batch(str(path)).nm_id) == [11]
+
+def test_short_rows_parse_like_dict_reader(tmp_path):
+    """Test iter_products pads short rows the way the DictReader path reads them."""
+    path = tmp_path / "report.csv"
+    path.write_text("nmId,sa_name,Продажи,Возвраты\n1,Футболка,5,2\n2,Шапка\n", encoding='utf-8')
+    
+    expected = [DataLoader.parse_wb_csv_to_product(row) for row in DataLoader.load_from_csv(str(path))]
+    products = list(DataLoader.iter_products(str(path)))
+    
+    assert [(p.nm_id, p.product_name, p.sales, p.returns) for p in products] == [
+        (p.nm_id, p.product_name, p.sales, p.returns) for p in expected
+    ] == [(1, "Футболка", 5, 2), (2, "Шапка", 0, 0)]
+
+def _write_csv(path, rows):
+    lines = ["nmId,sa_name,Продажи"] + [f"{nm_id},p{nm_id},{sales}" for nm_id, sales in rows]
+    path.write_text("\n".join(lines) + "\n", encoding='utf-8')
+
+def test_load_cached_hit_and_invalidation(tmp_path):
+    """Test Parquet sidecar is reused until the CSV changes."""
+    pytest.importorskip("pyarrow.parquet")
+    path = tmp_path / "report.csv"
+    _write_csv(path, [(1, 5)])
+    
+    assert list(DataLoader.load_cached(str(path)).sales) == [5]
+    cache = tmp_path / "report.parquet"
+    assert cache.exists()
+    assert list(tmp_path.glob("*.tmp")) == []
+    
+    # Повторная загрузка читает кэш, а не CSV
+    cache_mtime = cache.stat().st_mtime_ns
+    assert list(DataLoader.load_cached(str(path)).sales) == [5]
+    assert cache.stat().st_mtime_ns == cache_mtime
+    
+    # Изменённый CSV пересобирает кэш
+    _write_csv(path, [(1, 7), (2, 3)])
+    os.utime(path, ns=(cache_mtime + 10**9, cache_mtime + 10**9))
+    assert list(DataLoader.load_cached(str(path)).sales) == [7, 3]
+    assert list(DataLoader.load_cached(str(path)).nm_id) == [1, 2]
+
+def test_load_cached_rebuilds_corrupt_sidecar(tmp_path):
+    """Test a truncated Parquet sidecar is treated as a cache miss."""
+    pytest.importorskip("pyarrow.parquet")
+    path = tmp_path / "report.csv"
+    _write_csv(path, [(1, 5)])
+    cache = tmp_path / "report.parquet"
+    cache.write_bytes(b"PAR1 broken")
+    csv_mtime = path.stat().st_mtime_ns
+    os.utime(cache, ns=(csv_mtime, csv_mtime))
+    
+    assert list(DataLoader.load_cached(str(path)).sales) == [5]
+    assert list(DataLoader.load_cached(str(path)).sales) == [5]
+
+def test_load_from_json_cache_invalidation_and_copies(tmp_path):
+    """Test the JSON cache follows mtime and size changes and hands out copies."""
+    path = tmp_path / "report.json"
+    path.write_text('[{"nm_id": 1}]', encoding='utf-8')
+    mtime = path.stat().st_mtime_ns
+    
+    rows = DataLoader.load_from_json(str(path))
+    rows[0]["nm_id"] = 100
+    rows.append({"nm_id": 2})
+    assert DataLoader.load_from_json(str(path)) == [{"nm_id": 1}]
+    
+    # Тот же размер, другой mtime
+    path.write_text('[{"nm_id": 3}]', encoding='utf-8')
+    os.utime(path, ns=(mtime + 10**9, mtime + 10**9))
+    assert DataLoader.load_from_json(str(path)) == [{"nm_id": 3}]
+    
+    # Тот же mtime, другой размер
+    path.write_text('{"nm_id": 42}', encoding='utf-8')
+    os.utime(path, ns=(mtime + 10**9, mtime + 10**9))
+    assert DataLoader.load_from_json(str(path)) == [{"nm_id": 42}]
@@ -0,0 +1,25 @@
+"""Tests for MultiReportLoader."""
+from api import multi_report_loader
+from api.multi_report_loader import MultiReportLoader
+
+def test_close_keeps_shared_event_loop_for_other_loaders():
+    """Test the thread event loop is closed only after its last loader closes."""
+    first, second = MultiReportLoader("key"), MultiReportLoader("key")
+    first.load_reports_sync([], "2025-10-13T00:00:00Z")
+    second.load_reports_sync([], "2025-10-13T00:00:00Z")
+    loop = multi_report_loader._thread_local.loop
+    session = second._session
+    
+    first.close()
+    assert first._session is None
+    assert not loop.is_closed()
+    assert not session.closed
+    
+    # Повторный close не снимает чужую отметку
+    first.close()
+    assert not loop.is_closed()
+    
+    second.close()
+    assert session.closed
+    assert loop.is_closed()
+    assert multi_report_loader._thread_local.loop is None
@@ -0,0 +1,145 @@
+"""Tests for WBAPIClient."""
+import pytest
+import requests
+
+from api import wb_client
+from api.wb_client import WBAPIClient, WBAPIError, _CircuitBreaker
+
+class FakeClock:
+    """Подменяет time.monotonic: время двигается только вручную."""
+    
+    def __init__(self):
+        self.now = 1000.0
+    
+    def __call__(self) -> float:
+        return self.now
+
+class FakeSession:
+    """Сессия requests, отвечающая заданными HTTP кодами и считающая запросы."""
+    
+    def __init__(self, status_code: int = 200):
+        self.status_code = status_code
+        self.calls = 0
+    
+    def request(self, method, url, **kwargs):
+        self.calls += 1
+        response = requests.Response()
+        response.status_code = self.status_code
+        response.url = url
+        response._content = b"[]"
+        return response
+    
+    def close(self):
+        pass
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = FakeClock()
+    monkeypatch.setattr(wb_client.time, "monotonic", clock)
+    return clock
+
+def test_circuit_breaker_state_machine(clock):
+    """Test closed -> open -> half_open probe -> open/closed transitions."""
+    breaker = _CircuitBreaker(failure_threshold=5, cooldown=30.0)
+    
+    for _ in range(4):
+        breaker.record_failure()
+    assert breaker.state == "closed"
+    assert breaker.allow()
+    
+    breaker.record_failure()
+    assert breaker.state == "open"
+    assert not breaker.allow()
+    
+    clock.now += 29.9
+    assert not breaker.allow()
+    
+    # После паузы пропускается ровно один пробный запрос
+    clock.now += 0.1
+    assert breaker.allow()
+    assert breaker.state == "half_open"
+    assert not breaker.allow()
+    
+    # Неудачная проба снова открывает предохранитель на полную паузу
+    breaker.record_failure()
+    assert breaker.state == "open"
+    clock.now += 29.9
+    assert not breaker.allow()
+    
+    clock.now += 0.1
+    assert breaker.allow()
+    breaker.record_success()
+    assert breaker.state == "closed"
+    assert breaker.failure_count == 0
+    assert breaker.allow()
+
+def test_client_fails_fast_while_breaker_is_open(clock):
+    """Test the client stops calling WB after repeated 5xx and recovers after cooldown."""
+    client = WBAPIClient("key", "http://wb.test")
+    session = client.session = FakeSession(status_code=503)
+    
+    for _ in range(5):
+        with pytest.raises(WBAPIError) as error:
+            client.get_incomes("2025-10-13T00:00:00Z")
+        assert error.value.status_code == 503
+    assert session.calls == 5
+    
+    # Предохранитель открыт: запрос отклоняется без обращения к WB
+    with pytest.raises(WBAPIError, match="недоступен"):
+        client.get_incomes("2025-10-13T00:00:00Z")
+    assert session.calls == 5
+    
+    clock.now += 30.0
+    session.status_code = 200
+    assert client.get_incomes("2025-10-13T00:00:00Z") == []
+    assert session.calls == 6
+    assert client._breaker.state == "closed"
+
+def test_client_retries_network_errors(monkeypatch):
+    """Test dropped connections and timeouts are retried until the request succeeds."""
+    monkeypatch.setattr(wb_client.time, "sleep", lambda delay: None)
+    client = WBAPIClient("key", "http://wb.test")
+    session = client.session = FakeSession()
+    request = session.request
+    outcomes = [requests.exceptions.ConnectionError("reset"), requests.exceptions.Timeout("slow")]
+    
+    def flaky_request(method, url, **kwargs):
+        if outcomes:
+            session.calls += 1
+            raise outcomes.pop(0)
+        return request(method, url, **kwargs)
+    
+    session.request = flaky_request
+    
+    assert client.get_incomes("2025-10-13T00:00:00Z") == []
+    assert session.calls == 3
+    assert client._breaker.state == "closed"
+
+def test_failed_half_open_probe_reopens_breaker(clock):
+    """Test a probe failing with a non-network request error does not leave the breaker half open."""
+    client = WBAPIClient("key", "http://wb.test")
+    session = client.session = FakeSession(status_code=503)
+    
+    for _ in range(5):
+        with pytest.raises(WBAPIError):
+            client.get_incomes("2025-10-13T00:00:00Z")
+    assert client._breaker.state == "open"
+    
+    clock.now += 30.0
+    request = session.request
+    
+    def truncated_body(method, url, **kwargs):
+        session.calls += 1
+        raise requests.exceptions.ChunkedEncodingError("truncated")
+    
+    session.request = truncated_body
+    with pytest.raises(WBAPIError, match="truncated"):
+        client.get_incomes("2025-10-13T00:00:00Z")
+    assert client._breaker.state == "open"
+    
+    # После следующей паузы восстановившийся сервер снова принимает запросы
+    session.request = request
+    session.status_code = 200
+    clock.now += 30.0
+    assert client.get_incomes("2025-10-13T00:00:00Z") == []
+    assert client._breaker.state == "closed"